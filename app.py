@@ -1,9 +1,10 @@
 import streamlit as st
 import os
-from src.pdf_processor import extract_text_from_pdf
-from src.syllabus_generator import generate_syllabus, generate_topic_mapping
+from src.pdf_processor import format_outline
+from src.syllabus_generator import generate_syllabus, generate_topic_mapping, context_cache, parse_sections, regenerate_section, replace_section
 from src.course_manager import CourseManager
-from src.web_scraper import scrape_text_from_url
+from src.artifact_cache import fingerprint
+from src.text_cleaner import merge_stats, format_shrink_report
 
 # ... (rest of imports and setup)
 
@@ -115,6 +116,23 @@ selected_course = None
 
 # Sidebar for course management AND resources
 with st.sidebar:
+    # --- Search across all courses (sources and generated versions) ---
+    search_query = st.text_input("🔎 Search", placeholder="e.g. Kubernetes autoscaling", disabled=not course_manager.is_search_available())
+    if search_query:
+        results = course_manager.search(search_query, limit=10)
+        if results:
+            for result in results:
+                if result['kind'] == "version":
+                    label = f"📜 **{result['course']}** — {result['title']}"
+                else:
+                    location = f", {result['location']}" if result['location'] else ""
+                    label = f"📄 **{result['course']}** — {result['title']}{location}"
+                st.markdown(f"{label}  \n{result['snippet']}")
+        else:
+            st.info("No matches.")
+    
+    st.markdown("---")
+    
     st.header("Course Management")
     
     # Create New Course
@@ -217,65 +235,106 @@ if selected_course and api_key:
         placeholder="Describe how you want the syllabus to be structured. E.g., 'Focus on practical labs', 'Make it 8 weeks long', 'Include a section on ethics'."
     )
     
+    force_regenerate = st.checkbox("Force regenerate", help="Ignore cached drafts and call the model again even if sources and instructions are unchanged.")
+    
     if st.button("Generate Syllabus", type="primary"):
-        # 1. Aggregate Text from all PDFs
+        # 1. Load the corpus preprocessed when sources were added (rebuilt here only if stale)
         all_text = ""
-        pdf_dir = os.path.join(course_manager.root_dir, selected_course, "pdfs")
-        
-        # Re-fetch content to ensure we have latest
-        content = course_manager.get_course_content(selected_course)
-        
-        with st.spinner("Extracting text from all PDFs..."):
-            for pdf_file in content['pdf_files']:
-                file_path = os.path.join(pdf_dir, pdf_file)
-                text = extract_text_from_pdf(file_path)
-                all_text += f"\n--- Source PDF: {pdf_file} ---\n{text}\n"
-        
-        # 2. Scrape Text from Web Resources
         web_resources_text = ""
         scraped_web_content = ""
+        unstructured_text = ""
+        clean_stats = []
+        outlines = []
         
-        if content['links']:
-            with st.status("Processing Web Resources...") as status:
-                for link in content['links']:
-                    url = link['url']
-                    desc = link['description']
-                    status.write(f"Scraping {desc} ({url})...")
-                    
-                    scraped_text = scrape_text_from_url(url)
-                    
-                    # Add to the text context for the LLM
-                    scraped_web_content += f"\n--- Source Web: {desc} ({url}) ---\n{scraped_text}\n"
+        with st.spinner("Preparing source corpus..."):
+            with course_manager.get_corpus(selected_course) as corpus:
+                # Build stats are only about this click if the corpus was (re)built now
+                if corpus.built:
+                    corpus_skipped, corpus_rebuilt = corpus.skipped, corpus.rebuilt
+                else:
+                    corpus_skipped, corpus_rebuilt = ["corpus: all sources unchanged"], []
+                for source_idx, source in enumerate(corpus.sources):
+                    text = corpus.source_text(source_idx)
+                    clean_stats.append(source["stats"])
                     
-                    # Also keep the list format for the prompt's "Web Resources" section
-                    web_resources_text += f"- {desc}: {url}\n"
-                status.update(label="Web Resources Processed", state="complete")
+                    if source["kind"] == "pdf":
+                        all_text += f"\n--- Source PDF: {source['name']} ---\n{text}\n"
+                        # Bookmarked PDFs are mapped from their outline instead of bulk text
+                        if source["outline"]:
+                            outlines.append(format_outline(source["name"], source["outline"]))
+                        else:
+                            unstructured_text += f"\n--- Source PDF: {source['name']} ---\n{text}\n"
+                    else:
+                        # 2. Scraped text from Web Resources, plus the list for the prompt's "Web Resources" section
+                        scraped_web_content += f"\n--- Source Web: {source['name']} ({source['url']}) ---\n{text}\n"
+                        web_resources_text += f"- {source['name']}: {source['url']}\n"
+        
+        cache = course_manager.get_artifact_cache(selected_course)
+        cache.skipped.extend(corpus_skipped)
+        cache.rebuilt.extend(corpus_rebuilt)
         
         # Combine PDF text and Scraped Web text
         full_context_text = all_text + "\n" + scraped_web_content
         
         st.info(f"Total extracted text length: {len(full_context_text)} characters (PDFs + Web).")
+        if clean_stats:
+            st.caption(format_shrink_report(merge_stats(*clean_stats)))
         
         if len(full_context_text) < 50:
             st.warning("⚠️ Very little text extracted. The AI might hallucinate if it has no source material. Please ensure PDFs have selectable text or URLs are accessible.")
 
-        # 3. Generate Content
-        # 3. Generate Content
+        # 3. Generate Content (each output is reused while its inputs are unchanged;
+        # the source excerpt is sent once and shared by the calls via context_cache)
+        shared_context = context_cache.session(scope=selected_course)
+        def cached_generation(stage, key, fp, generate):
+            result = None if force_regenerate else cache.get(stage, key, fp)
+            if result is None:
+                if force_regenerate:
+                    cache.rebuilt.append(f"{stage}: {key}")
+                result = generate()
+                if not result.startswith("Error generating"):
+                    cache.put(stage, key, fp, result)
+            return result
+        
+        syllabus_fp = fingerprint(full_context_text, web_resources_text, additional_instructions)
+        
         # Generate English Syllabus
         with st.spinner("Generating English Syllabus..."):
-            syllabus_en = generate_syllabus(full_context_text, web_resources_text, additional_instructions, api_key, language='en')
+            syllabus_en = cached_generation("syllabus", "en", syllabus_fp, lambda: generate_syllabus(full_context_text, web_resources_text, additional_instructions, api_key, language='en', shared_context=shared_context))
         
         # Generate Italian Syllabus
         with st.spinner("Generating Italian Syllabus..."):
-            syllabus_it = generate_syllabus(full_context_text, web_resources_text, additional_instructions, api_key, language='it')
+            syllabus_it = cached_generation("syllabus", "it", syllabus_fp, lambda: generate_syllabus(full_context_text, web_resources_text, additional_instructions, api_key, language='it', shared_context=shared_context))
             
         # Generate Topic Mapping
         with st.spinner("Generating Topic Mapping..."):
-            topic_mapping = generate_topic_mapping(full_context_text, api_key)
+            if outlines:
+                # The outline-only prompt is far smaller than the shared excerpt
+                outline_text = "\n\n".join(outlines)
+                mapping_text = unstructured_text + "\n" + scraped_web_content
+                topic_mapping = cached_generation("topic_mapping", "mapping", fingerprint(mapping_text, outline_text), lambda: generate_topic_mapping(mapping_text, api_key, outline_text=outline_text))
+            else:
+                topic_mapping = cached_generation("topic_mapping", "mapping", fingerprint(full_context_text), lambda: generate_topic_mapping(full_context_text, api_key, shared_context=shared_context))
             
-        # Save Version
-        version_num = course_manager.save_version(selected_course, syllabus_en, syllabus_it, topic_mapping)
-        st.success(f"Syllabus generated and saved as Version {version_num}!")
+        # Save Version (unless every draft came unchanged from the cache, which would only duplicate it)
+        generated_stages = [label for label in cache.rebuilt if label.startswith(("syllabus", "topic_mapping"))]
+        if generated_stages:
+            version_num = course_manager.save_version(selected_course, syllabus_en, syllabus_it, topic_mapping)
+            st.success(f"Syllabus generated and saved as Version {version_num}!")
+        else:
+            st.info("Sources and instructions are unchanged, so the cached drafts are shown and no new version was saved. Tick 'Force regenerate' for a fresh draft.")
+        cache_stats = shared_context.stats()
+        if cache_stats["hits"] + cache_stats["misses"]:
+            st.caption(
+                f"Context cache: {cache_stats['hits']} hit(s), {cache_stats['misses']} miss(es) "
+                f"({cache_stats['hit_rate']:.0%} hit rate, backend: {', '.join(cache_stats['backends'])}); "
+                f"{cache_stats['cached_tokens']:,} of {cache_stats['prompt_tokens']:,} input tokens served from cache."
+            )
+        if cache.skipped:
+            with st.expander(f"♻️ Reused {len(cache.skipped)} unchanged stage(s), rebuilt {len(cache.rebuilt)}"):
+                st.markdown("**Skipped (unchanged):**\n" + "\n".join(f"- {label}" for label in cache.skipped))
+                if cache.rebuilt:
+                    st.markdown("**Rebuilt:**\n" + "\n".join(f"- {label}" for label in cache.rebuilt))
             
         # Display Results
         st.markdown("---")
@@ -350,6 +409,50 @@ if 'loaded_version' in st.session_state and selected_course:
                     st.rerun()
                 else:
                     st.error("Error saving.")
+            
+            # Earlier revisions kept by the version store (the last entry is the current one)
+            history = course_manager.get_version_history(selected_course, version_num, content_key)
+            if len(history) > 1:
+                with st.expander(f"🕘 Edit history ({len(history) - 1} earlier revisions)"):
+                    revision = st.selectbox(
+                        "Revision",
+                        options=[h['revision'] for h in history[:-1]],
+                        format_func=lambda r: f"#{r + 1} ({history[r]['timestamp']})",
+                        key=f"history_{tab_key}"
+                    )
+                    st.markdown(course_manager.get_version_revision(selected_course, version_num, content_key, revision))
+            
+            # Regenerate a single section (syllabi only) instead of the whole
+            # document; the title and "Program Modules" wrapper are not offered
+            sections = [sec for sec in parse_sections(content[content_key]) if sec['regenerable']] if content_key.startswith("syllabus") else []
+            if sections and api_key:
+                with st.expander("🎯 Regenerate a Section"):
+                    section_id = st.selectbox(
+                        "Section",
+                        options=[sec['id'] for sec in sections],
+                        format_func=lambda sid: next(f"{'  ' * (sec['level'] - 1)}{sec['title']}" for sec in sections if sec['id'] == sid),
+                        key=f"section_{tab_key}"
+                    )
+                    change_request = st.text_input("What should change?", key=f"section_change_{tab_key}")
+                    if st.button("Regenerate Section", key=f"section_regen_{tab_key}"):
+                        section = next(sec for sec in sections if sec['id'] == section_id)
+                        section_text = content[content_key][section['start']:section['end']]
+                        with st.spinner(f"Regenerating '{section['title']}'..."):
+                            with course_manager.get_corpus(selected_course, revalidate_web=False) as corpus:
+                                excerpt = corpus.relevant_excerpt(f"{section_text}\n{change_request}")
+                            language = "it" if content_key == "syllabus_it" else "en"
+                            new_section = regenerate_section(content[content_key], section_id, excerpt, change_request, api_key, language=language)
+                        if new_section.startswith("Error regenerating"):
+                            st.error(new_section)
+                        else:
+                            new_text = replace_section(content[content_key], section_id, new_section)
+                            if course_manager.update_version_content(selected_course, version_num, content_key, new_text):
+                                st.session_state['loaded_version'] = course_manager.get_version_content(selected_course, version_num)
+                                # Drop the editor's stale text so it shows the spliced document
+                                st.session_state.pop(f"edit_{tab_key}", None)
+                                st.rerun()
+                            else:
+                                st.error("Error saving.")
         else:
             # Clean content of potential code fences
             clean_text = content[content_key]
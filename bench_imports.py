@@ -0,0 +1,98 @@
+import argparse
+import ast
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+# Modules that must not be loaded just to start the app and list courses
+HEAVY_MODULES = [
+    "google.generativeai",
+    "pypdf",
+    "requests",
+    "bs4",
+    "markdown",
+    "xhtml2pdf",
+    "reportlab",
+]
+
+# Run in a fresh interpreter: run app.py's top-level src imports and list courses
+COLD_START_SCRIPT = """
+import json, sys, time
+start = time.perf_counter()
+exec(sys.argv[3])
+from src.course_manager import CourseManager
+CourseManager(sys.argv[1]).list_courses()
+elapsed_ms = (time.perf_counter() - start) * 1000
+heavy = [m for m in json.loads(sys.argv[2]) if m in sys.modules]
+print(json.dumps({"elapsed_ms": elapsed_ms, "heavy": heavy}))
+"""
+
+
+def app_imports(app_path):
+    """
+    Returns the top-level `from src... import ...` statements of app.py, so the
+    benchmark always loads what the app loads at startup.
+
+    Args:
+        app_path (str): Path to app.py.
+
+    Returns:
+        str: The import statements, one per line.
+    """
+    with open(app_path, "r", encoding="utf-8") as f:
+        tree = ast.parse(f.read(), filename=app_path)
+    return "\n".join(
+        ast.unparse(node) for node in tree.body
+        if isinstance(node, (ast.Import, ast.ImportFrom)) and ast.unparse(node).startswith(("from src", "import src"))
+    )
+
+
+def measure_cold_start(runs):
+    """
+    Measures the cold start of the app's own modules in fresh interpreters.
+
+    Args:
+        runs (int): Number of fresh interpreters to launch.
+
+    Returns:
+        tuple[list[float], list[str]]: Timings in milliseconds and the heavy
+        modules that were loaded eagerly.
+    """
+    repo_dir = os.path.dirname(os.path.abspath(__file__))
+    imports = app_imports(os.path.join(repo_dir, "app.py"))
+    timings = []
+    heavy = set()
+    with tempfile.TemporaryDirectory() as courses_dir:
+        for _ in range(runs):
+            result = subprocess.run(
+                [sys.executable, "-c", COLD_START_SCRIPT, courses_dir, json.dumps(HEAVY_MODULES), imports],
+                cwd=repo_dir, capture_output=True, text=True, check=True
+            )
+            data = json.loads(result.stdout.strip().splitlines()[-1])
+            timings.append(data["elapsed_ms"])
+            heavy.update(data["heavy"])
+    return timings, sorted(heavy)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Cold-start import benchmark for Syllaber.")
+    parser.add_argument("--runs", type=int, default=5, help="Number of fresh interpreters to launch.")
+    parser.add_argument("--budget-ms", type=float, default=float(os.environ.get("SYLLABER_IMPORT_BUDGET_MS", 150)),
+                        help="Fail if the median cold start exceeds this many milliseconds.")
+    args = parser.parse_args()
+
+    timings, heavy = measure_cold_start(args.runs)
+    median_ms = statistics.median(timings)
+    print(f"Cold start: median {median_ms:.1f} ms, min {min(timings):.1f} ms, max {max(timings):.1f} ms over {args.runs} runs (budget {args.budget_ms:.0f} ms)")
+
+    failed = False
+    if heavy:
+        print(f"FAIL: heavy modules imported eagerly: {', '.join(heavy)}")
+        failed = True
+    if median_ms > args.budget_ms:
+        print(f"FAIL: cold start over budget by {median_ms - args.budget_ms:.1f} ms")
+        failed = True
+    sys.exit(1 if failed else 0)
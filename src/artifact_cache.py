@@ -0,0 +1,127 @@
+import hashlib
+import json
+import os
+import threading
+
+# Serializes manifest read-merge-write across ArtifactCache instances of this
+# process (e.g. the UI and a background corpus build on the same course).
+_manifest_lock = threading.Lock()
+
+
+def fingerprint(*parts):
+    """
+    Returns a stable SHA-256 fingerprint of JSON-serializable parts.
+
+    Args:
+        *parts: Values the artifact depends on (text, dicts, lists...).
+
+    Returns:
+        str: Hex digest.
+    """
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+def file_fingerprint(file_path):
+    """
+    Returns the SHA-256 of a file's contents.
+
+    Args:
+        file_path (str): Path to the file.
+
+    Returns:
+        str: Hex digest.
+    """
+    digest = hashlib.sha256()
+    with open(file_path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class ArtifactCache:
+    """
+    Per-course store of intermediate artifacts (extracted text, scraped pages,
+    generated documents) keyed by the fingerprint of the inputs they were
+    derived from. An artifact is reused only while its fingerprint matches.
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        self.manifest_path = os.path.join(cache_dir, "manifest.json")
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+        self.manifest = self._load_manifest()
+
+        # Stage labels touched during this run, for reporting in the UI
+        self.skipped = []
+        self.rebuilt = []
+
+    def _artifact_path(self, stage, key):
+        name = hashlib.sha1(f"{stage}\0{key}".encode("utf-8")).hexdigest()
+        return os.path.join(self.cache_dir, f"{name}.json")
+
+    def _load_manifest(self):
+        try:
+            with open(self.manifest_path, "r") as f:
+                return json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return {}
+
+    def _update_manifest(self, update):
+        """
+        Applies update(manifest) to the manifest currently on disk and saves it,
+        so entries written meanwhile by another instance are kept.
+        """
+        with _manifest_lock:
+            manifest = self._load_manifest()
+            update(manifest)
+            tmp_path = self.manifest_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(manifest, f, indent=4)
+            os.replace(tmp_path, self.manifest_path)
+            self.manifest = manifest
+
+    def get(self, stage, key, fp):
+        """
+        Returns the cached artifact for (stage, key) if it was built from the
+        same fingerprint, otherwise None. A None fingerprint is always a miss.
+        """
+        entry = self.manifest.get(stage, {}).get(key)
+        if fp is not None and entry and entry["fingerprint"] == fp:
+            try:
+                with open(self._artifact_path(stage, key), "r", encoding="utf-8") as f:
+                    value = json.load(f)
+                self.skipped.append(f"{stage}: {key}")
+                return value
+            except (FileNotFoundError, json.JSONDecodeError):
+                pass
+        self.rebuilt.append(f"{stage}: {key}")
+        return None
+
+    def put(self, stage, key, fp, value):
+        """Stores an artifact and the fingerprint of the inputs it was built from."""
+        with open(self._artifact_path(stage, key), "w", encoding="utf-8") as f:
+            json.dump(value, f, ensure_ascii=False)
+
+        def record(manifest):
+            manifest.setdefault(stage, {})[key] = {"fingerprint": fp}
+
+        self._update_manifest(record)
+
+    def prune(self, stage, live_keys):
+        """Drops artifacts of a stage whose key is no longer a course source."""
+        stale = []
+
+        def drop_stale(manifest):
+            entries = manifest.get(stage, {})
+            stale.extend(key for key in entries if key not in live_keys)
+            for key in stale:
+                del entries[key]
+
+        self._update_manifest(drop_stale)
+        for key in stale:
+            try:
+                os.remove(self._artifact_path(stage, key))
+            except FileNotFoundError:
+                pass
@@ -0,0 +1,403 @@
+import json
+import mmap
+import os
+import re
+import threading
+
+from src.artifact_cache import ArtifactCache, fingerprint, file_fingerprint
+from src.search_index import open_search_index
+from src.pdf_processor import extract_pages_from_pdf, extract_outline_from_pdf
+from src.text_cleaner import clean_pages, clean_text
+from src.web_scraper import scrape_text_from_url, fetch_url_validators
+
+# Target size of a chunk; chunks never span two pages or two sources.
+CHUNK_CHARS = 2000
+
+
+def extract_pdf_source(cache, file_path, name):
+    """
+    Extracts cleaned pages and the outline of a PDF, reusing the cached result
+    while the file content is unchanged.
+
+    Args:
+        cache (ArtifactCache): The course's artifact cache.
+        file_path (str): Path to the PDF file.
+        name (str): PDF filename, used as cache key.
+
+    Returns:
+        dict: 'pages' (list[str]), 'stats' and 'outline'.
+    """
+    pdf_fp = file_fingerprint(file_path)
+    extracted = cache.get("pdf_text", name, pdf_fp)
+    if extracted is None:
+        pages, stats = clean_pages(extract_pages_from_pdf(file_path))
+        extracted = {"pages": pages, "stats": stats, "outline": extract_outline_from_pdf(file_path)}
+        cache.put("pdf_text", name, pdf_fp, extracted)
+    return extracted
+
+
+def extract_web_source(cache, url):
+    """
+    Scrapes and cleans a web page, reusing the cached text while the server's
+    ETag/Last-Modified are unchanged. Pages without validators are always re-scraped.
+
+    Args:
+        cache (ArtifactCache): The course's artifact cache.
+        url (str): The URL to scrape.
+
+    Returns:
+        dict: 'text', 'stats' and the 'validators' the text was checked against.
+    """
+    validators = fetch_url_validators(url)
+    url_fp = fingerprint(url, validators) if validators else None
+    scraped = cache.get("web_text", url, url_fp)
+    if scraped is None:
+        text, stats = clean_text(scrape_text_from_url(url))
+        scraped = {"text": text, "stats": stats}
+        if url_fp and not text.startswith("Error scraping"):
+            cache.put("web_text", url, url_fp, scraped)
+    return {**scraped, "validators": validators}
+
+
+def _split_units(text, separators=("\n\n", "\n")):
+    """
+    Splits text on the coarsest separator that keeps pieces under CHUNK_CHARS
+    (paragraphs, then lines), hard-splitting anything still too long.
+    Yields (separator, piece) pairs; the separator joins the piece to the previous one.
+    """
+    if not separators:
+        for i in range(0, len(text), CHUNK_CHARS):
+            yield "", text[i:i + CHUNK_CHARS]
+        return
+    separator = separators[0]
+    for i, piece in enumerate(text.split(separator)):
+        if len(piece) <= CHUNK_CHARS:
+            yield (separator if i else ""), piece
+        else:
+            # Scraped pages join lines with single newlines and have no blank lines
+            for j, (sub_separator, sub_piece) in enumerate(_split_units(piece, separators[1:])):
+                yield (separator if i and not j else sub_separator), sub_piece
+
+
+def _chunk_page(text):
+    """Splits a page on paragraph (or line) boundaries into pieces of at most CHUNK_CHARS."""
+    chunks = []
+    current = ""
+    for separator, piece in _split_units(text):
+        if current and len(current) + len(separator) + len(piece) > CHUNK_CHARS:
+            chunks.append(current)
+            current = piece
+        else:
+            current = f"{current}{separator}{piece}" if current else piece
+    if current:
+        chunks.append(current)
+    return chunks
+
+
+def _load_links(course_path):
+    with open(os.path.join(course_path, "resources.json"), "r") as f:
+        return json.load(f)["links"]
+
+
+def _list_pdfs(course_path):
+    pdf_dir = os.path.join(course_path, "pdfs")
+    return sorted(f for f in os.listdir(pdf_dir) if f.lower().endswith('.pdf'))
+
+
+def source_signature(course_path):
+    """
+    Returns a cheap fingerprint of the course's sources (PDF names, sizes and
+    modification times, plus the link list) used to tell if the corpus is stale.
+    """
+    pdf_dir = os.path.join(course_path, "pdfs")
+    pdfs = []
+    for name in _list_pdfs(course_path):
+        st = os.stat(os.path.join(pdf_dir, name))
+        pdfs.append([name, st.st_size, st.st_mtime_ns])
+    return fingerprint(pdfs, _load_links(course_path))
+
+
+def build_corpus(course_path):
+    """
+    Builds the course corpus: every source is cleaned, chunked and written to
+    corpus/corpus.txt, with corpus/index.json recording the byte offset and
+    length of each chunk by source and page. Changed sources are also
+    re-indexed in the shared search index.
+
+    Args:
+        course_path (str): Path to the course directory.
+    """
+    signature = source_signature(course_path)
+    cache = ArtifactCache(os.path.join(course_path, "cache"))
+    pdfs = _list_pdfs(course_path)
+    links = _load_links(course_path)
+    cache.prune("pdf_text", set(pdfs))
+    cache.prune("web_text", {link["url"] for link in links})
+
+    course = os.path.basename(course_path)
+    search_index = open_search_index(os.path.join(os.path.dirname(course_path), "search.db"))
+    if search_index:
+        # Web sources are keyed by URL: descriptions are free text and may repeat
+        search_index.prune_sources(course, set(pdfs) | {link["url"] for link in links})
+
+    corpus_dir = os.path.join(course_path, "corpus")
+    os.makedirs(corpus_dir, exist_ok=True)
+    text_path = os.path.join(corpus_dir, "corpus.txt")
+    index_path = os.path.join(corpus_dir, "index.json")
+
+    sources = []
+    chunks = []
+    offset = 0
+    with open(text_path + ".tmp", "wb") as out:
+        def write_chunks(source_idx, page, text):
+            nonlocal offset
+            for chunk in _chunk_page(text):
+                data = chunk.encode("utf-8") + b"\n"
+                out.write(data)
+                chunks.append({"source": source_idx, "page": page, "offset": offset, "length": len(data) - 1})
+                offset += len(data)
+
+        for name in pdfs:
+            extracted = extract_pdf_source(cache, os.path.join(course_path, "pdfs", name), name)
+            first_chunk = len(chunks)
+            for page_num, page_text in enumerate(extracted["pages"], start=1):
+                write_chunks(len(sources), page_num, page_text)
+            if search_index:
+                search_index.index_source(course, name, [(f"p. {n}", text) for n, text in enumerate(extracted["pages"], start=1)])
+            sources.append({
+                "kind": "pdf",
+                "name": name,
+                "outline": extracted["outline"],
+                "stats": extracted["stats"],
+                "chunks": [first_chunk, len(chunks)],
+            })
+
+        for link in links:
+            scraped = extract_web_source(cache, link["url"])
+            first_chunk = len(chunks)
+            write_chunks(len(sources), None, scraped["text"])
+            if search_index:
+                search_index.index_source(course, link["url"], [(link["url"], scraped["text"])], title=link["description"])
+            sources.append({
+                "kind": "web",
+                "name": link["description"],
+                "url": link["url"],
+                "validators": scraped["validators"],
+                "stats": scraped["stats"],
+                "chunks": [first_chunk, len(chunks)],
+            })
+
+    with open(index_path + ".tmp", "w") as f:
+        json.dump({
+            "signature": signature,
+            "sources": sources,
+            "chunks": chunks,
+            "skipped": cache.skipped,
+            "rebuilt": cache.rebuilt,
+        }, f)
+    os.replace(text_path + ".tmp", text_path)
+    os.replace(index_path + ".tmp", index_path)
+    # Only now are all of the course's sources in the search index
+    if search_index:
+        search_index.mark_course_indexed(course)
+
+
+class CorpusReader:
+    """
+    Read-only view of a built corpus. The text file is memory-mapped, so
+    chunks are sliced on demand without loading the whole corpus.
+    """
+
+    def __init__(self, corpus_dir):
+        with open(os.path.join(corpus_dir, "index.json"), "r") as f:
+            index = json.load(f)
+        self.signature = index["signature"]
+        self.sources = index["sources"]
+        self.chunks = index["chunks"]
+        # Extraction stages reused/redone by the build that produced this corpus
+        self.skipped = index.get("skipped", [])
+        self.rebuilt = index.get("rebuilt", [])
+        # True only when load_corpus had to build this corpus during the call
+        self.built = False
+
+        self._file = open(os.path.join(corpus_dir, "corpus.txt"), "rb")
+        if os.fstat(self._file.fileno()).st_size:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        else:
+            self._map = b""
+
+    def close(self):
+        if isinstance(self._map, mmap.mmap):
+            self._map.close()
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def read_chunk(self, chunk_idx):
+        """Returns the text of one chunk."""
+        chunk = self.chunks[chunk_idx]
+        return self._map[chunk["offset"]:chunk["offset"] + chunk["length"]].decode("utf-8")
+
+    def source_chunks(self, source_idx, page=None):
+        """Returns the chunk indexes of a source, optionally restricted to one page."""
+        start, end = self.sources[source_idx]["chunks"]
+        return [i for i in range(start, end) if page is None or self.chunks[i]["page"] == page]
+
+    def source_text(self, source_idx):
+        """Returns the full cleaned text of a source."""
+        return "\n\n".join(self.read_chunk(i) for i in self.source_chunks(source_idx))
+
+    def relevant_excerpt(self, query, max_chars=8000):
+        """
+        Returns the chunks sharing the most words with query, labelled by
+        source and page, up to max_chars. Chunks are read one at a time.
+
+        Args:
+            query (str): Text to match, e.g. a syllabus section.
+            max_chars (int): Size budget of the excerpt.
+
+        Returns:
+            str: The excerpt, best chunks first.
+        """
+        terms = {word for word in re.findall(r"\w+", query.lower()) if len(word) > 3}
+        scored = []
+        for chunk_idx in range(len(self.chunks)):
+            words = set(re.findall(r"\w+", self.read_chunk(chunk_idx).lower()))
+            score = len(terms & words)
+            if score:
+                scored.append((score, chunk_idx))
+        scored.sort(key=lambda item: (-item[0], item[1]))
+
+        parts = []
+        used = 0
+        for _, chunk_idx in scored:
+            chunk = self.chunks[chunk_idx]
+            source = self.sources[chunk["source"]]
+            label = f"{source['name']}, p. {chunk['page']}" if chunk["page"] else source["name"]
+            part = f"--- {label} ---\n{self.read_chunk(chunk_idx)}\n"
+            if used + len(part) > max_chars:
+                if parts:
+                    # Lower-ranked but smaller chunks may still fit
+                    continue
+                # Never return nothing because the best chunk alone is too long
+                part = part[:max_chars]
+            parts.append(part)
+            used += len(part)
+        return "\n".join(parts)
+
+
+_build_lock = threading.Lock()
+_build_threads = {}
+_build_pending = set()
+# One lock per course, held while its corpus files are written or opened, so
+# background and synchronous builds never interleave their writes
+_course_locks = {}
+
+
+def _course_lock(course_path):
+    with _build_lock:
+        return _course_locks.setdefault(course_path, threading.Lock())
+
+
+def _build_worker(course_path):
+    while True:
+        with _build_lock:
+            _build_pending.discard(course_path)
+        try:
+            with _course_lock(course_path):
+                build_corpus(course_path)
+        except Exception:
+            # Surfaced by the synchronous rebuild in load_corpus
+            pass
+        with _build_lock:
+            if course_path not in _build_pending:
+                del _build_threads[course_path]
+                return
+
+
+def schedule_corpus_build(course_path):
+    """
+    Rebuilds the course corpus in a background thread. Requests made while a
+    build is running are coalesced into a single follow-up build.
+    """
+    with _build_lock:
+        _build_pending.add(course_path)
+        if course_path not in _build_threads:
+            thread = threading.Thread(target=_build_worker, args=(course_path,), daemon=True)
+            _build_threads[course_path] = thread
+            thread.start()
+
+
+def wait_for_corpus_build(course_path):
+    """Blocks until no background build is running for the course."""
+    while True:
+        with _build_lock:
+            thread = _build_threads.get(course_path)
+        if thread is None:
+            return
+        thread.join()
+
+
+def _web_sources_changed(reader):
+    """
+    Returns True if any web source may have changed since the corpus was built:
+    its ETag/Last-Modified differ, or the server sends none to compare.
+    """
+    for source in reader.sources:
+        if source["kind"] != "web":
+            continue
+        validators = source.get("validators")
+        if not validators or fetch_url_validators(source["url"]) != validators:
+            return True
+    return False
+
+
+def _sources_indexed(course_path):
+    """Returns False for a course whose sources never made it into the search index."""
+    search_index = open_search_index(os.path.join(os.path.dirname(course_path), "search.db"))
+    return search_index is None or search_index.is_course_indexed(os.path.basename(course_path))
+
+
+def load_corpus(course_path, revalidate_web=True):
+    """
+    Returns a CorpusReader for an up-to-date corpus, waiting for a running
+    background build and rebuilding synchronously if the corpus is stale.
+    Courses from before the search index are rebuilt once so their sources
+    get indexed.
+
+    Args:
+        course_path (str): Path to the course directory.
+        revalidate_web (bool): Also treat the corpus as stale if a web source
+            changed (HEAD check) or cannot be validated.
+
+    Returns:
+        CorpusReader: The course corpus.
+    """
+    wait_for_corpus_build(course_path)
+
+    corpus_dir = os.path.join(course_path, "corpus")
+    signature = source_signature(course_path)
+    try:
+        with _course_lock(course_path):
+            reader = CorpusReader(corpus_dir)
+        if (
+            reader.signature == signature
+            and _sources_indexed(course_path)
+            and not (revalidate_web and _web_sources_changed(reader))
+        ):
+            return reader
+        reader.close()
+    except (FileNotFoundError, json.JSONDecodeError, KeyError):
+        pass
+
+    # The rebuild reuses cached extraction for every source that did not change;
+    # it holds the course lock, so a build scheduled meanwhile waits for it
+    with _course_lock(course_path):
+        build_corpus(course_path)
+        reader = CorpusReader(corpus_dir)
+    reader.built = True
+    return reader
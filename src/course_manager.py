@@ -2,12 +2,41 @@ import os
 import shutil
 import json
 from typing import List, Dict
-from src.pdf_generator import convert_markdown_to_pdf
+from src.artifact_cache import ArtifactCache
+from src.search_index import open_search_index
+from src.version_store import VersionStore, DEFAULT_RETENTION
+from src.corpus import CorpusReader, load_corpus, schedule_corpus_build, wait_for_corpus_build
+
+# Course roots whose pre-index courses were already backfilled in this process
+_backfilled_roots = set()
+
+# Titles of the generated documents, as shown in search results
+CONTENT_TITLES = {
+    "syllabus_en": "English Syllabus",
+    "syllabus_it": "Italian Syllabus",
+    "topic_mapping": "Topic Mapping",
+}
+
+# Per document: metadata key of its PDF, content key of the PDF name, PDF filename label
+CONTENT_PDFS = {
+    "syllabus_en": ("pdf_en", "pdf_name_en", "Syllabus_English"),
+    "syllabus_it": ("pdf_it", "pdf_name_it", "Syllabus_Italian"),
+    "topic_mapping": ("pdf_tm", "pdf_name_tm", "Topic_Mapping"),
+}
 
 class CourseManager:
-    def __init__(self, root_dir="courses"):
+    def __init__(self, root_dir="courses", retention=None):
+        """
+        Args:
+            root_dir (str): Directory holding one subdirectory per course.
+            retention (dict, optional): Overrides for DEFAULT_RETENTION
+                ('max_edit_history', 'keep_pdfs_for_last'; None keeps everything).
+        """
         self.root_dir = root_dir
+        self.retention = {**DEFAULT_RETENTION, **(retention or {})}
         os.makedirs(self.root_dir, exist_ok=True)
+        # None when SQLite lacks FTS5: search is disabled, everything else works
+        self.search_index = open_search_index(os.path.join(self.root_dir, "search.db"))
 
     def create_course(self, name: str) -> bool:
         """Creates a new course directory structure."""
@@ -22,7 +51,9 @@ class CourseManager:
         resources = {"links": []}
         with open(os.path.join(course_path, "resources.json"), "w") as f:
             json.dump(resources, f)
-            
+        
+        if self.search_index:
+            self.search_index.mark_course_indexed(name)
         return True
 
     def list_courses(self) -> List[str]:
@@ -33,13 +64,17 @@ class CourseManager:
         """Deletes a course and all its data."""
         course_path = os.path.join(self.root_dir, name)
         if os.path.exists(course_path):
+            wait_for_corpus_build(course_path)
             shutil.rmtree(course_path)
+        if self.search_index:
+            self.search_index.remove_course(name)
 
     def add_pdf(self, course_name: str, file_obj, filename: str):
         """Saves an uploaded PDF to the course's pdfs directory."""
         save_path = os.path.join(self.root_dir, course_name, "pdfs", filename)
         with open(save_path, "wb") as f:
             f.write(file_obj.getbuffer())
+        schedule_corpus_build(os.path.join(self.root_dir, course_name))
 
     def add_link(self, course_name: str, url: str, description: str):
         """Adds a web resource link to resources.json."""
@@ -52,6 +87,7 @@ class CourseManager:
         
         with open(json_path, "w") as f:
             json.dump(data, f, indent=4)
+        schedule_corpus_build(os.path.join(self.root_dir, course_name))
 
     def get_course_content(self, course_name: str) -> Dict:
         """
@@ -73,66 +109,70 @@ class CourseManager:
             "links": data["links"]
         }
 
+    def get_artifact_cache(self, course_name: str) -> ArtifactCache:
+        """Returns the cache of intermediate artifacts derived from the course's sources."""
+        return ArtifactCache(os.path.join(self.root_dir, course_name, "cache"))
+
+    def get_corpus(self, course_name: str, revalidate_web: bool = True) -> CorpusReader:
+        """
+        Returns the preprocessed corpus of the course, building it if it is missing or stale.
+        With revalidate_web, web pages that changed (or cannot be validated) are re-scraped.
+        """
+        return load_corpus(os.path.join(self.root_dir, course_name), revalidate_web=revalidate_web)
+
+    def _get_version_store(self, course_name: str) -> VersionStore:
+        return VersionStore(os.path.join(self.root_dir, course_name, "output", "store"))
+
+    def _write_versions(self, course_name: str, versions: List[Dict]):
+        versions_file = os.path.join(self.root_dir, course_name, "versions.json")
+        with open(versions_file, "w") as f:
+            json.dump(versions, f, indent=4)
+
     def save_version(self, course_name: str, syllabus_en: str, syllabus_it: str, topic_mapping: str):
-        """Saves a new version of the generated content (Markdown and PDF)."""
-        course_path = os.path.join(self.root_dir, course_name)
-        output_dir = os.path.join(course_path, "output")
-        versions_file = os.path.join(course_path, "versions.json")
+        """
+        Saves a new version of the generated content. Markdown is stored as a
+        compressed delta against the previous version, PDFs are stored compressed.
+        """
+        # Deferred: markdown/xhtml2pdf/reportlab are only needed when rendering PDFs
+        from src.pdf_generator import convert_markdown_to_pdf
         
-        # Load existing versions
-        if os.path.exists(versions_file):
-            with open(versions_file, "r") as f:
-                versions = json.load(f)
-        else:
-            versions = []
+        versions = self.get_versions(course_name)
+        self._migrate_legacy_versions(course_name, versions)
+        store = self._get_version_store(course_name)
             
         # Determine new version number
         next_version_num = len(versions) + 1
         version_name = f"v{next_version_num}"
-        version_dir = os.path.join(output_dir, version_name)
-        os.makedirs(version_dir, exist_ok=True)
-        
-        # Save Markdown files
-        with open(os.path.join(version_dir, "syllabus_en.md"), "w", encoding="utf-8") as f:
-            f.write(syllabus_en)
-        with open(os.path.join(version_dir, "syllabus_it.md"), "w", encoding="utf-8") as f:
-            f.write(syllabus_it)
-        with open(os.path.join(version_dir, "topic_mapping.md"), "w", encoding="utf-8") as f:
-            f.write(topic_mapping)
-            
-        # Save PDF files
-        pdf_en = convert_markdown_to_pdf(syllabus_en)
-        if pdf_en:
-            pdf_name_en = f"{course_name}_Syllabus_English_{version_name}.pdf"
-            with open(os.path.join(version_dir, pdf_name_en), "wb") as f:
-                f.write(pdf_en)
-                
-        pdf_it = convert_markdown_to_pdf(syllabus_it)
-        if pdf_it:
-            pdf_name_it = f"{course_name}_Syllabus_Italian_{version_name}.pdf"
-            with open(os.path.join(version_dir, pdf_name_it), "wb") as f:
-                f.write(pdf_it)
-                
-        pdf_tm = convert_markdown_to_pdf(topic_mapping)
-        if pdf_tm:
-            pdf_name_tm = f"{course_name}_Topic_Mapping_{version_name}.pdf"
-            with open(os.path.join(version_dir, pdf_name_tm), "wb") as f:
-                f.write(pdf_tm)
-            
-        # Update metadata
+        previous = versions[-1] if versions else None
+        
         import datetime
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        versions.append({
+        version_meta = {
             "version": next_version_num,
             "name": version_name,
             "timestamp": timestamp,
-            "pdf_en": pdf_name_en if pdf_en else None,
-            "pdf_it": pdf_name_it if pdf_it else None,
-            "pdf_tm": pdf_name_tm if pdf_tm else None
-        })
+            "history": {}
+        }
         
-        with open(versions_file, "w") as f:
-            json.dump(versions, f, indent=4)
+        texts = {"syllabus_en": syllabus_en, "syllabus_it": syllabus_it, "topic_mapping": topic_mapping}
+        for content_type, text in texts.items():
+            pdf_key, _, pdf_label = CONTENT_PDFS[content_type]
+            
+            # Save Markdown as a delta against the same document in the previous version
+            base_id = previous["history"][content_type][-1]["id"] if previous else None
+            version_meta["history"][content_type] = [{"id": store.put_text(text, base_id), "timestamp": timestamp}]
+            self._index_version_document(course_name, version_name, content_type, text)
+            
+            # Save PDF
+            pdf_bytes = convert_markdown_to_pdf(text)
+            version_meta[pdf_key] = None
+            if pdf_bytes:
+                version_meta[pdf_key] = f"{course_name}_{pdf_label}_{version_name}.pdf"
+                store.put_pdf(version_meta[pdf_key], pdf_bytes)
+        
+        versions.append(version_meta)
+        self._apply_retention(course_name, versions)
+        self._write_versions(course_name, versions)
             
         return next_version_num
 
@@ -144,48 +184,81 @@ class CourseManager:
                 return json.load(f)
         return []
 
+    def _read_version_markdown(self, course_name: str, version_meta: Dict) -> Dict:
+        """Returns the current Markdown of each document of a version."""
+        if "history" in version_meta:
+            store = self._get_version_store(course_name)
+            return {
+                content_type: store.get_text(history[-1]["id"])
+                for content_type, history in version_meta["history"].items()
+            }
+        
+        # Versions saved before the version store: plain files in output/vN/
+        version_dir = os.path.join(self.root_dir, course_name, "output", version_meta["name"])
+        texts = {}
+        for content_type in CONTENT_PDFS:
+            with open(os.path.join(version_dir, f"{content_type}.md"), "r", encoding="utf-8") as f:
+                texts[content_type] = f.read()
+        return texts
+
     def get_version_content(self, course_name: str, version_num: int) -> Dict:
-        """Returns content of a specific version, including PDF paths."""
-        version_dir = os.path.join(self.root_dir, course_name, "output", f"v{version_num}")
-        versions_file = os.path.join(self.root_dir, course_name, "versions.json")
+        """
+        Returns content of a specific version, including PDF bytes. PDFs pruned
+        by the retention policy are regenerated from the Markdown.
+        """
+        version_meta = next((v for v in self.get_versions(course_name) if v['version'] == version_num), None)
+        if version_meta is None:
+            return None
         
-        content = {}
         try:
-            # Read Markdown
-            with open(os.path.join(version_dir, "syllabus_en.md"), "r", encoding="utf-8") as f:
-                content["syllabus_en"] = f.read()
-            with open(os.path.join(version_dir, "syllabus_it.md"), "r", encoding="utf-8") as f:
-                content["syllabus_it"] = f.read()
-            with open(os.path.join(version_dir, "topic_mapping.md"), "r", encoding="utf-8") as f:
-                content["topic_mapping"] = f.read()
-                
-            # Get PDF filenames from metadata
-            if os.path.exists(versions_file):
-                with open(versions_file, "r") as f:
-                    versions = json.load(f)
-                    version_meta = next((v for v in versions if v['version'] == version_num), None)
-                    if version_meta:
-                        if version_meta.get("pdf_en"):
-                            with open(os.path.join(version_dir, version_meta["pdf_en"]), "rb") as f:
-                                content["pdf_en"] = f.read()
-                                content["pdf_name_en"] = version_meta["pdf_en"]
-                        if version_meta.get("pdf_it"):
-                            with open(os.path.join(version_dir, version_meta["pdf_it"]), "rb") as f:
-                                content["pdf_it"] = f.read()
-                                content["pdf_name_it"] = version_meta["pdf_it"]
-                        if version_meta.get("pdf_tm"):
-                            with open(os.path.join(version_dir, version_meta["pdf_tm"]), "rb") as f:
-                                content["pdf_tm"] = f.read()
-                                content["pdf_name_tm"] = version_meta["pdf_tm"]
+            content = self._read_version_markdown(course_name, version_meta)
+            
+            store = self._get_version_store(course_name)
+            version_dir = os.path.join(self.root_dir, course_name, "output", version_meta["name"])
+            for content_type, (pdf_key, pdf_name_key, _) in CONTENT_PDFS.items():
+                pdf_name = version_meta.get(pdf_key)
+                if not pdf_name:
+                    continue
+                if "history" in version_meta:
+                    pdf_bytes = store.get_pdf(pdf_name)
+                    if pdf_bytes is None:
+                        from src.pdf_generator import convert_markdown_to_pdf
+                        pdf_bytes = convert_markdown_to_pdf(content[content_type])
+                else:
+                    with open(os.path.join(version_dir, pdf_name), "rb") as f:
+                        pdf_bytes = f.read()
+                if pdf_bytes:
+                    content[pdf_key] = pdf_bytes
+                    content[pdf_name_key] = pdf_name
                                 
         except FileNotFoundError:
             return None
             
         return content
 
+    def get_version_history(self, course_name: str, version_num: int, content_type: str) -> List[Dict]:
+        """
+        Returns the edit history of one document of a version, oldest first.
+        The last entry is the current content.
+        """
+        version_meta = next((v for v in self.get_versions(course_name) if v['version'] == version_num), None)
+        if version_meta is None or "history" not in version_meta:
+            return []
+        return [
+            {"revision": i, "timestamp": entry["timestamp"]}
+            for i, entry in enumerate(version_meta["history"][content_type])
+        ]
+
+    def get_version_revision(self, course_name: str, version_num: int, content_type: str, revision: int) -> str:
+        """Returns the Markdown of a revision listed by get_version_history."""
+        version_meta = next((v for v in self.get_versions(course_name) if v['version'] == version_num), None)
+        rev_id = version_meta["history"][content_type][revision]["id"]
+        return self._get_version_store(course_name).get_text(rev_id)
+
     def update_version_content(self, course_name: str, version_num: int, content_type: str, new_text: str):
         """
         Updates the content of a specific version and regenerates the PDF.
+        The previous content is kept in the edit history.
         
         Args:
             course_name (str): Name of the course.
@@ -193,46 +266,156 @@ class CourseManager:
             content_type (str): 'syllabus_en', 'syllabus_it', or 'topic_mapping'.
             new_text (str): The new markdown content.
         """
-        version_dir = os.path.join(self.root_dir, course_name, "output", f"v{version_num}")
-        versions_file = os.path.join(self.root_dir, course_name, "versions.json")
+        from src.pdf_generator import convert_markdown_to_pdf
         
-        # Map content type to filenames
-        file_map = {
-            "syllabus_en": ("syllabus_en.md", f"{course_name}_Syllabus_English_v{version_num}.pdf", "pdf_en"),
-            "syllabus_it": ("syllabus_it.md", f"{course_name}_Syllabus_Italian_v{version_num}.pdf", "pdf_it"),
-            "topic_mapping": ("topic_mapping.md", f"{course_name}_Topic_Mapping_v{version_num}.pdf", "pdf_tm")
-        }
+        if content_type not in CONTENT_PDFS:
+            return False
         
-        if content_type not in file_map:
+        versions = self.get_versions(course_name)
+        version_meta = next((v for v in versions if v['version'] == version_num), None)
+        if version_meta is None:
             return False
-            
-        md_filename, pdf_filename, json_key = file_map[content_type]
+        self._migrate_legacy_versions(course_name, versions)
+        store = self._get_version_store(course_name)
+        pdf_key, _, pdf_label = CONTENT_PDFS[content_type]
         
-        # 1. Save Markdown
-        with open(os.path.join(version_dir, md_filename), "w", encoding="utf-8") as f:
-            f.write(new_text)
+        # 1. Save Markdown as a delta against the current revision
+        import datetime
+        timestamp = datetime.datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        history = version_meta["history"][content_type]
+        history.append({"id": store.put_text(new_text, history[-1]["id"]), "timestamp": timestamp})
+        self._index_version_document(course_name, f"v{version_num}", content_type, new_text)
             
         # 2. Regenerate PDF
         pdf_bytes = convert_markdown_to_pdf(new_text)
         if pdf_bytes:
-            with open(os.path.join(version_dir, pdf_filename), "wb") as f:
-                f.write(pdf_bytes)
+            version_meta[pdf_key] = f"{course_name}_{pdf_label}_v{version_num}.pdf"
+            store.put_pdf(version_meta[pdf_key], pdf_bytes)
                 
-        # 3. Ensure metadata is correct (though filenames are stable)
-        if os.path.exists(versions_file):
-            with open(versions_file, "r") as f:
-                versions = json.load(f)
-            
-            updated = False
-            for v in versions:
-                if v['version'] == version_num:
-                    if v.get(json_key) != pdf_filename:
-                        v[json_key] = pdf_filename
-                        updated = True
-                    break
-            
-            if updated:
-                with open(versions_file, "w") as f:
-                    json.dump(versions, f, indent=4)
+        # 3. Prune and save metadata
+        self._apply_retention(course_name, versions)
+        self._write_versions(course_name, versions)
                     
         return True
+
+    def _migrate_legacy_versions(self, course_name: str, versions: List[Dict]):
+        """
+        Moves versions saved as plain files in output/vN/ into the version store.
+        A legacy directory is deleted only once every file in it was migrated.
+        """
+        legacy = [v for v in versions if "history" not in v]
+        if not legacy:
+            return
+        
+        store = self._get_version_store(course_name)
+        base_ids = {}
+        migrated_files = {}
+        for version_meta in versions:
+            if "history" not in version_meta:
+                version_dir = os.path.join(self.root_dir, course_name, "output", version_meta["name"])
+                migrated = migrated_files[version_meta["name"]] = set()
+                version_meta["history"] = {}
+                for content_type, (pdf_key, _, _) in CONTENT_PDFS.items():
+                    # Each file is read on its own: a missing document must not cost the others
+                    text = ""
+                    md_name = f"{content_type}.md"
+                    try:
+                        with open(os.path.join(version_dir, md_name), "r", encoding="utf-8") as f:
+                            text = f.read()
+                        migrated.add(md_name)
+                    except FileNotFoundError:
+                        pass
+                    version_meta["history"][content_type] = [
+                        {"id": store.put_text(text, base_ids.get(content_type)), "timestamp": version_meta["timestamp"]}
+                    ]
+                    
+                    pdf_name = version_meta.get(pdf_key)
+                    if pdf_name and os.path.exists(os.path.join(version_dir, pdf_name)):
+                        with open(os.path.join(version_dir, pdf_name), "rb") as f:
+                            store.put_pdf(pdf_name, f.read())
+                        migrated.add(pdf_name)
+            base_ids = {content_type: history[-1]["id"] for content_type, history in version_meta["history"].items()}
+        
+        # Metadata must point at the store before the plain files go away
+        self._write_versions(course_name, versions)
+        for version_meta in legacy:
+            version_dir = os.path.join(self.root_dir, course_name, "output", version_meta["name"])
+            if os.path.isdir(version_dir) and set(os.listdir(version_dir)) <= migrated_files[version_meta["name"]]:
+                shutil.rmtree(version_dir)
+
+    def _apply_retention(self, course_name: str, versions: List[Dict]):
+        """
+        Trims edit histories and stored PDFs according to self.retention, then
+        deletes revisions no longer referenced.
+        """
+        store = self._get_version_store(course_name)
+        
+        max_edit_history = self.retention.get("max_edit_history")
+        if max_edit_history is not None:
+            for version_meta in versions:
+                for history in version_meta["history"].values():
+                    del history[:-(max_edit_history + 1)]
+        
+        keep_pdfs_for_last = self.retention.get("keep_pdfs_for_last")
+        if keep_pdfs_for_last is not None:
+            old_versions = versions[:max(len(versions) - keep_pdfs_for_last, 0)]
+            for version_meta in old_versions:
+                for pdf_key, _, _ in CONTENT_PDFS.values():
+                    if version_meta.get(pdf_key):
+                        store.delete_pdf(version_meta[pdf_key])
+        
+        live_ids = {
+            entry["id"]
+            for version_meta in versions
+            for history in version_meta["history"].values()
+            for entry in history
+        }
+        store.prune(live_ids)
+
+    def _index_version_document(self, course_name: str, version_name: str, content_type: str, text: str):
+        """Adds a generated Markdown document to the search index."""
+        if not self.search_index:
+            return
+        title = f"{version_name} · {CONTENT_TITLES[content_type]}"
+        self.search_index.index_version_document(course_name, version_name, content_type, title, text)
+
+    def _backfill_search_index(self, course_name: str):
+        """
+        Indexes the versions of a course created before the search index existed.
+        Its sources are indexed, and the course marked as indexed, by its next
+        corpus build (load_corpus rebuilds corpora of unindexed courses).
+        """
+        for version in self.get_versions(course_name):
+            try:
+                texts = self._read_version_markdown(course_name, version)
+            except FileNotFoundError:
+                continue
+            for content_type, text in texts.items():
+                self._index_version_document(course_name, version["name"], content_type, text)
+
+    def search(self, query: str, course_name: str = None, limit: int = 20) -> List[Dict]:
+        """
+        Full-text search over generated versions and extracted source text.
+        
+        Args:
+            query (str): Free-text query.
+            course_name (str, optional): Restrict results to one course.
+            limit (int): Maximum number of results.
+            
+        Returns:
+            List[Dict]: Ranked results (see SearchIndex.search); empty if search is unavailable.
+        """
+        if not self.search_index:
+            return []
+        # Courses from before the index existed are backfilled once per process
+        if self.root_dir not in _backfilled_roots:
+            indexed = self.search_index.indexed_courses()
+            for course in self.list_courses():
+                if course not in indexed:
+                    self._backfill_search_index(course)
+            _backfilled_roots.add(self.root_dir)
+        return self.search_index.search(query, course=course_name, limit=limit)
+
+    def is_search_available(self) -> bool:
+        """Returns False when the local SQLite build has no FTS5 support."""
+        return self.search_index is not None
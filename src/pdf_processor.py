@@ -1,5 +1,5 @@
-import pypdf
 import os
+from src.text_cleaner import clean_pages
 
 def extract_text_from_pdf(file_path):
     """
@@ -11,6 +11,8 @@ def extract_text_from_pdf(file_path):
     Returns:
         str: Extracted text.
     """
+    import pypdf
+    
     try:
         reader = pypdf.PdfReader(file_path)
         text = ""
@@ -19,3 +21,115 @@ def extract_text_from_pdf(file_path):
         return text
     except Exception as e:
         return f"Error extracting text: {e}"
+
+def extract_pages_from_pdf(file_path):
+    """
+    Extracts the text of each page of a PDF file.
+    
+    Args:
+        file_path (str): Path to the PDF file.
+        
+    Returns:
+        list[str]: Text of each page, or a single error message.
+    """
+    import pypdf
+    
+    try:
+        reader = pypdf.PdfReader(file_path)
+        return [page.extract_text() or "" for page in reader.pages]
+    except Exception as e:
+        return [f"Error extracting text: {e}"]
+
+def extract_clean_text_from_pdf(file_path):
+    """
+    Extracts text from a PDF file with running headers, footers, page numbers,
+    TOC and copyright lines removed.
+    
+    Args:
+        file_path (str): Path to the PDF file.
+        
+    Returns:
+        tuple[str, dict]: Cleaned text and shrink stats (see text_cleaner.clean_pages).
+    """
+    pages, stats = clean_pages(extract_pages_from_pdf(file_path))
+    return "\n\n".join(page for page in pages if page), stats
+
+def _flatten_outline(reader, items, level=0):
+    """Walks pypdf's nested outline list, yielding (title, level, page_index)."""
+    for item in items:
+        if isinstance(item, list):
+            yield from _flatten_outline(reader, item, level + 1)
+            continue
+        try:
+            page_index = reader.get_destination_page_number(item)
+        except Exception:
+            continue
+        if page_index is None or page_index < 0:
+            continue
+        yield (item.title or "").strip(), level, page_index
+
+def extract_outline_from_pdf(file_path):
+    """
+    Extracts the outline (bookmarks) of a PDF file as a flat table of contents
+    with page ranges and printed page labels.
+    
+    Args:
+        file_path (str): Path to the PDF file.
+        
+    Returns:
+        list[dict]: One entry per bookmark with 'title', 'level', 'start_page',
+        'end_page' (1-based physical pages), 'start_label' and 'end_label'.
+        Empty if the PDF has no outline or cannot be read.
+    """
+    import pypdf
+    
+    try:
+        reader = pypdf.PdfReader(file_path)
+        num_pages = len(reader.pages)
+        flat = [e for e in _flatten_outline(reader, reader.outline) if e[0]]
+        try:
+            labels = reader.page_labels
+        except Exception:
+            labels = []
+    except Exception:
+        return []
+    
+    if len(labels) != num_pages:
+        labels = [str(i + 1) for i in range(num_pages)]
+    
+    entries = []
+    for i, (title, level, page_index) in enumerate(flat):
+        end_index = num_pages - 1
+        for next_title, next_level, next_page in flat[i + 1:]:
+            if next_level <= level:
+                end_index = max(page_index, next_page - 1)
+                break
+        entries.append({
+            "title": title,
+            "level": level,
+            "start_page": page_index + 1,
+            "end_page": end_index + 1,
+            "start_label": labels[page_index],
+            "end_label": labels[end_index],
+        })
+    return entries
+
+def format_outline(source_name, entries):
+    """
+    Formats outline entries as a compact indented table of contents.
+    
+    Args:
+        source_name (str): Name of the source PDF.
+        entries (list[dict]): Entries from extract_outline_from_pdf.
+        
+    Returns:
+        str: Markdown list, one line per entry.
+    """
+    lines = [f"### {source_name}"]
+    for entry in entries:
+        if entry["start_label"] == entry["end_label"]:
+            pages = f"p. {entry['start_label']}"
+        else:
+            pages = f"pp. {entry['start_label']}–{entry['end_label']}"
+        lines.append(f"{'  ' * entry['level']}- {entry['title']} ({pages})")
+    return "\n".join(lines)
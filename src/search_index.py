@@ -0,0 +1,170 @@
+import hashlib
+import re
+import sqlite3
+from contextlib import closing
+
+# Column weights for bm25(): matches in the title count more than in the body.
+# Order follows the documents table: course, kind, source, location, title, body.
+_BM25_WEIGHTS = "0.0, 0.0, 0.0, 0.0, 5.0, 1.0"
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+
+def open_search_index(db_path):
+    """
+    Opens the search index, or returns None if this Python's SQLite was built
+    without FTS5 (search is then disabled rather than breaking the app).
+    """
+    try:
+        return SearchIndex(db_path)
+    except sqlite3.OperationalError:
+        return None
+
+
+def _fts_query(query):
+    """Turns free text into a safe FTS5 query: all words required, last one as a prefix."""
+    tokens = _TOKEN_RE.findall(query)
+    if not tokens:
+        return None
+    quoted = [f'"{token}"' for token in tokens]
+    quoted[-1] += "*"
+    return " ".join(quoted)
+
+
+class SearchIndex:
+    """
+    Local SQLite FTS5 index over generated Markdown and extracted source text,
+    shared by all courses. Each call opens its own connection so the index can
+    be updated from the background corpus build while the UI searches.
+    """
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        with closing(self._connect()) as conn, conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS documents USING fts5("
+                "course UNINDEXED, kind UNINDEXED, source UNINDEXED, location UNINDEXED, "
+                "title, body, tokenize='unicode61 remove_diacritics 2')"
+            )
+            # Content hash of each indexed source, so unchanged sources are not re-indexed
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS indexed_sources ("
+                "course TEXT, source TEXT, content_hash TEXT, PRIMARY KEY (course, source))"
+            )
+            conn.execute("CREATE TABLE IF NOT EXISTS indexed_courses (course TEXT PRIMARY KEY)")
+
+    def _connect(self):
+        return sqlite3.connect(self.db_path, timeout=30)
+
+    def index_version_document(self, course, version_name, content_type, title, body):
+        """Indexes (or replaces) one generated Markdown document of a version."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute(
+                "DELETE FROM documents WHERE course = ? AND kind = 'version' AND source = ? AND location = ?",
+                (course, version_name, content_type)
+            )
+            conn.execute(
+                "INSERT INTO documents (course, kind, source, location, title, body) VALUES (?, 'version', ?, ?, ?, ?)",
+                (course, version_name, content_type, title, body)
+            )
+
+    def index_source(self, course, source, pages, title=None):
+        """
+        Indexes the text of a source one page per row, skipping the work if the
+        content is unchanged since it was last indexed.
+
+        Args:
+            course (str): Course name.
+            source (str): Unique key of the source: PDF filename or web URL.
+            pages (list[tuple[str, str]]): (location, text) pairs, e.g. ("p. 12", "...").
+            title (str, optional): Display title (e.g. the link description);
+                defaults to source.
+        """
+        title = title or source
+        digest = hashlib.sha256(f"{title}\0".encode("utf-8"))
+        for location, text in pages:
+            digest.update(f"{location}\0{text}\0".encode("utf-8"))
+        content_hash = digest.hexdigest()
+
+        with closing(self._connect()) as conn, conn:
+            row = conn.execute(
+                "SELECT content_hash FROM indexed_sources WHERE course = ? AND source = ?",
+                (course, source)
+            ).fetchone()
+            if row and row[0] == content_hash:
+                return
+            conn.execute("DELETE FROM documents WHERE course = ? AND kind = 'source' AND source = ?", (course, source))
+            conn.executemany(
+                "INSERT INTO documents (course, kind, source, location, title, body) VALUES (?, 'source', ?, ?, ?, ?)",
+                [(course, source, location, title, text) for location, text in pages if text]
+            )
+            conn.execute(
+                "INSERT OR REPLACE INTO indexed_sources (course, source, content_hash) VALUES (?, ?, ?)",
+                (course, source, content_hash)
+            )
+
+    def prune_sources(self, course, live_sources):
+        """Removes indexed sources that no longer belong to the course."""
+        with closing(self._connect()) as conn, conn:
+            indexed = [row[0] for row in conn.execute("SELECT source FROM indexed_sources WHERE course = ?", (course,))]
+            for source in indexed:
+                if source not in live_sources:
+                    conn.execute("DELETE FROM documents WHERE course = ? AND kind = 'source' AND source = ?", (course, source))
+                    conn.execute("DELETE FROM indexed_sources WHERE course = ? AND source = ?", (course, source))
+
+    def remove_course(self, course):
+        """Removes every document of a course."""
+        with closing(self._connect()) as conn, conn:
+            conn.execute("DELETE FROM documents WHERE course = ?", (course,))
+            conn.execute("DELETE FROM indexed_sources WHERE course = ?", (course,))
+            conn.execute("DELETE FROM indexed_courses WHERE course = ?", (course,))
+
+    def indexed_courses(self):
+        """Returns the names of courses already indexed (or created with the index)."""
+        with closing(self._connect()) as conn:
+            return {row[0] for row in conn.execute("SELECT course FROM indexed_courses")}
+
+    def is_course_indexed(self, course):
+        with closing(self._connect()) as conn:
+            return conn.execute("SELECT 1 FROM indexed_courses WHERE course = ?", (course,)).fetchone() is not None
+
+    def mark_course_indexed(self, course):
+        with closing(self._connect()) as conn, conn:
+            conn.execute("INSERT OR IGNORE INTO indexed_courses (course) VALUES (?)", (course,))
+
+    def search(self, query, course=None, limit=20):
+        """
+        Runs a ranked full-text search.
+
+        Args:
+            query (str): Free-text query; all words must match, the last as a prefix.
+            course (str, optional): Restrict results to one course.
+            limit (int): Maximum number of results.
+
+        Returns:
+            list[dict]: Results with 'course', 'kind' ('version' or 'source'),
+            'source', 'location', 'title' and a highlighted 'snippet', best first.
+        """
+        fts_query = _fts_query(query)
+        if not fts_query:
+            return []
+
+        sql = (
+            "SELECT course, kind, source, location, title, "
+            "snippet(documents, 5, '**', '**', '…', 16) "
+            "FROM documents WHERE documents MATCH ?"
+        )
+        params = [fts_query]
+        if course:
+            sql += " AND course = ?"
+            params.append(course)
+        sql += f" ORDER BY bm25(documents, {_BM25_WEIGHTS}) LIMIT ?"
+        params.append(limit)
+
+        with closing(self._connect()) as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return [
+            {"course": r[0], "kind": r[1], "source": r[2], "location": r[3], "title": r[4], "snippet": " ".join(r[5].split())}
+            for r in rows
+        ]
@@ -1,7 +1,205 @@
-import google.generativeai as genai
+import datetime
+import hashlib
 import os
+import re
+import threading
+import time
 
-def generate_syllabus(text, web_resources_text, additional_instructions, api_key, language='en'):
+_HEADING_RE = re.compile(r"^(#{1,6})[ \t]+(.+?)[ \t#]*$", re.MULTILINE)
+
+# Explicitly versioned name required by the cached-content API
+CACHE_MODEL_NAME = 'models/gemini-2.0-flash-001'
+
+# Below this size (about 4k tokens) the provider refuses to cache; use the local backend
+MIN_REMOTE_CACHE_CHARS = 16000
+
+class GeminiContextBackend:
+    """Sends the shared context once through Gemini's cached-content API."""
+    
+    name = "gemini"
+    # Later calls refer to the uploaded context instead of sending it again
+    remote = True
+    
+    def create(self, genai, context_text, ttl_seconds):
+        from google.generativeai import caching
+        
+        if len(context_text) < MIN_REMOTE_CACHE_CHARS:
+            raise ValueError("context too small for remote caching")
+        return caching.CachedContent.create(
+            model=CACHE_MODEL_NAME,
+            display_name="syllaber-source-context",
+            contents=[context_text],
+            ttl=datetime.timedelta(seconds=ttl_seconds),
+        )
+    
+    def generate(self, genai, handle, prompt):
+        model = genai.GenerativeModel.from_cached_content(cached_content=handle)
+        return model.generate_content(prompt)
+    
+    def delete(self, handle):
+        handle.delete()
+
+class LocalContextBackend:
+    """
+    Stub backend emulating a context cache locally: the handle is the context
+    itself, sent as a prompt prefix on every call. Used when the provider
+    cannot cache (small contexts, unsupported models, API errors).
+    """
+    
+    name = "local"
+    remote = False
+    
+    def create(self, genai, context_text, ttl_seconds):
+        return context_text
+    
+    def generate(self, genai, handle, prompt):
+        model = genai.GenerativeModel('gemini-2.0-flash')
+        return model.generate_content(f"{handle}\n\n{prompt}")
+    
+    def delete(self, handle):
+        pass
+
+class ContextCache:
+    """
+    Shares a large context prefix (the source excerpt) across model calls.
+    The prefix is uploaded once and later calls, in the same run or in later
+    runs within the TTL, refer to it by handle. Calls go through a
+    ContextCacheSession, which keeps the stats of one run.
+    """
+    
+    def __init__(self, ttl_seconds=3600, backends=None):
+        self.ttl_seconds = ttl_seconds
+        self.backends = backends or [GeminiContextBackend(), LocalContextBackend()]
+        self._entries = {}
+        # Streamlit runs sessions in parallel threads sharing the module-level cache
+        self._lock = threading.Lock()
+    
+    def session(self, scope=None):
+        """
+        Starts a run against the cache.
+        
+        Args:
+            scope (str, optional): What the context belongs to (e.g. the course).
+                A new context in the same scope supersedes, and deletes, the old one.
+                
+        Returns:
+            ContextCacheSession: The run's view of the cache.
+        """
+        return ContextCacheSession(self, scope)
+    
+    def _delete_entries(self, entries):
+        """Deletes the handles of entries already removed from the cache."""
+        for entry in entries:
+            try:
+                entry["backend"].delete(entry["handle"])
+            except Exception:
+                # Remote handles expire with their TTL anyway
+                pass
+    
+    def _get_entry(self, genai, api_key, context_text, scope=None):
+        """Returns (entry, reused) for context_text, creating the entry if needed."""
+        context_hash = hashlib.sha256(context_text.encode("utf-8")).hexdigest()
+        key = hashlib.sha256(f"{api_key}\0{CACHE_MODEL_NAME}\0{scope or context_hash}".encode("utf-8")).hexdigest()
+        now = time.time()
+        
+        # The lock only guards the dict: uploads and deletes are network calls
+        # and must not block other sessions
+        with self._lock:
+            # Leave a margin so a handle never expires between lookup and use
+            stale = [self._entries.pop(k) for k, e in list(self._entries.items()) if e["expires"] - 60 <= now]
+            entry = self._entries.get(key)
+            if entry and entry["context_hash"] != context_hash:
+                # The scope's context changed (e.g. a source was added)
+                stale.append(self._entries.pop(key))
+                entry = None
+        self._delete_entries(stale)
+        if entry:
+            return entry, True
+        
+        for backend in self.backends:
+            try:
+                handle = backend.create(genai, context_text, self.ttl_seconds)
+            except Exception:
+                continue
+            entry = {"backend": backend, "handle": handle, "context_hash": context_hash, "expires": now + self.ttl_seconds}
+            break
+        else:
+            raise RuntimeError("no context cache backend available")
+        
+        with self._lock:
+            current = self._entries.get(key)
+            if current and current["context_hash"] == context_hash:
+                # Another session created the same context meanwhile: keep theirs
+                stale, entry = [entry], current
+            else:
+                stale = [current] if current else []
+                self._entries[key] = entry
+        self._delete_entries(stale)
+        return entry, False
+
+class ContextCacheSession:
+    """
+    One run's use of a ContextCache (e.g. a click on Generate), with its own
+    hit/miss and token counts so concurrent runs do not mix their stats.
+    """
+    
+    def __init__(self, cache, scope=None):
+        self.cache = cache
+        self.scope = scope
+        self.hits = 0
+        self.misses = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.backends = set()
+    
+    def generate(self, genai, api_key, context_text, prompt):
+        """
+        Calls the model with context_text as a shared prefix of prompt.
+        
+        Args:
+            genai: The configured google.generativeai module.
+            api_key (str): Google Gemini API Key (cached contexts are per project).
+            context_text (str): The shared prefix.
+            prompt (str): The call-specific instructions.
+            
+        Returns:
+            The model response.
+        """
+        entry, reused = self.cache._get_entry(genai, api_key, context_text, self.scope)
+        # Only a remote handle saves resending the context; a local one is a miss
+        if reused and entry["backend"].remote:
+            self.hits += 1
+        else:
+            self.misses += 1
+        self.backends.add(entry["backend"].name)
+        response = entry["backend"].generate(genai, entry["handle"], prompt)
+        
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            self.prompt_tokens += getattr(usage, "prompt_token_count", 0) or 0
+            self.cached_tokens += getattr(usage, "cached_content_token_count", 0) or 0
+        return response
+    
+    def stats(self):
+        """Returns hit/miss counts, hit rate, input tokens served from the cache and backends used."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "prompt_tokens": self.prompt_tokens,
+            "cached_tokens": self.cached_tokens,
+            "backends": sorted(self.backends),
+        }
+
+# Module-level so handles survive Streamlit reruns within the TTL
+context_cache = ContextCache()
+
+def _source_context(text):
+    """The shared prefix: identical for every call given the same source text."""
+    return f"Source Text (excerpt):\n{text[:30000]}"
+
+def generate_syllabus(text, web_resources_text, additional_instructions, api_key, language='en', shared_context=None):
     """
     Generates a course syllabus from the provided text and web resources using Gemini API.
     
@@ -11,13 +209,16 @@ def generate_syllabus(text, web_resources_text, additional_instructions, api_key
         additional_instructions (str): User-provided custom instructions.
         api_key (str): Google Gemini API Key.
         language (str): Target language ('en' or 'it').
+        shared_context (ContextCacheSession, optional): Send the source excerpt
+            through this session so later calls with the same text reuse it.
         
     Returns:
         str: Generated syllabus in Markdown format.
     """
+    # Deferred: google.generativeai is slow to import and only needed to call the model
+    import google.generativeai as genai
+    
     genai.configure(api_key=api_key)
-    # Use a model that is definitely available
-    model = genai.GenerativeModel('gemini-2.0-flash')
     
     lang_instruction = "English" if language == 'en' else "Italian"
     
@@ -41,45 +242,220 @@ def generate_syllabus(text, web_resources_text, additional_instructions, api_key
     
     Web Resources to incorporate:
     {web_resources_text}
+    """
     
+    try:
+        if shared_context is not None:
+            prompt += "\n    Base the syllabus on the Source Text provided above.\n"
+            response = shared_context.generate(genai, api_key, _source_context(text), prompt)
+        else:
+            prompt += f"""
     Source Text (excerpt):
     {text[:30000]} 
     """
-    
-    try:
-        response = model.generate_content(prompt)
+            # Use a model that is definitely available
+            model = genai.GenerativeModel('gemini-2.0-flash')
+            response = model.generate_content(prompt)
         return response.text
     except Exception as e:
         return f"Error generating syllabus: {e}"
 
-def generate_topic_mapping(text, api_key):
+def generate_topic_mapping(text, api_key, outline_text=None, shared_context=None):
     """
     Generates a topic mapping file linking syllabus blocks to references and labs.
     
     Args:
-        text (str): The source text.
+        text (str): The source text. When outline_text is given, this should only
+            hold sources that have no outline (e.g. web pages, PDFs without bookmarks).
         api_key (str): Google Gemini API Key.
+        outline_text (str, optional): Structured table of contents of the source
+            PDFs with page ranges (see pdf_processor.format_outline).
+        shared_context (ContextCacheSession, optional): Without outline_text, read
+            the source excerpt from this session; text must then be the same full
+            context passed to generate_syllabus. Ignored with outline_text, whose
+            short prompt is cheaper than any shared bulk excerpt.
         
     Returns:
         str: Generated topic mapping in Markdown format.
     """
+    import google.generativeai as genai
+    
     genai.configure(api_key=api_key)
-    model = genai.GenerativeModel('gemini-2.0-flash')
+    
+    use_shared_context = shared_context is not None and not outline_text
+    if outline_text:
+        source_section = f"""
+    Source Structure (table of contents with exact page ranges):
+    {outline_text}
+    
+    Other Sources (excerpt):
+    {text[:8000]}
+    """
+        chapter_instruction = "List the exact chapters or sections, with their page ranges, from the Source Structure that cover it. Only cite entries that appear in the Source Structure or Other Sources."
+    elif use_shared_context:
+        source_section = "Use the Source Text provided above."
+        chapter_instruction = "List the specific chapters or sections from the source text that cover it."
+    else:
+        source_section = f"""
+    Source Text:
+    {text[:30000]}
+    """
+        chapter_instruction = "List the specific chapters or sections from the source text that cover it."
     
     prompt = f"""
-    Based on the following text, create a 'Topic Mapping' document.
-    For each major topic or block identified in the text:
-    1. List the specific chapters or sections from the source text that cover it.
+    Based on the following sources, create a 'Topic Mapping' document.
+    For each major topic or block identified in the sources:
+    1. {chapter_instruction}
     2. Suggest relevant Google Cloud Skills Boost labs or similar hands-on activities (just titles if URLs are unknown, but try to be specific).
     
     Format as a Markdown table or list.
-    
-    Source Text:
-    {text[:30000]}
+    {source_section}
     """
     
     try:
-        response = model.generate_content(prompt)
+        if use_shared_context:
+            response = shared_context.generate(genai, api_key, _source_context(text), prompt)
+        else:
+            model = genai.GenerativeModel('gemini-2.0-flash')
+            response = model.generate_content(prompt)
         return response.text
     except Exception as e:
         return f"Error generating topic mapping: {e}"
+
+def parse_sections(markdown_text):
+    """
+    Splits a generated Markdown document into addressable sections, one per
+    heading (e.g. Learning Intent, each Program Module, Expectations).
+    A section runs until the next heading of the same or a higher level, so
+    it includes its sub-headings (e.g. a module's Theory/Organization/Labs).
+    Every section can be regenerated except the document title and top-level
+    wrappers like "Program Modules", which only group other sections.
+    
+    Args:
+        markdown_text (str): The syllabus Markdown.
+        
+    Returns:
+        list[dict]: Sections in document order with 'id', 'title', 'level',
+        'start'/'end' character offsets into markdown_text, and 'regenerable'.
+    """
+    headings = [(m.start(), len(m.group(1)), m.group(2).strip()) for m in _HEADING_RE.finditer(markdown_text)]
+    
+    sections = []
+    for i, (start, level, title) in enumerate(headings):
+        end = len(markdown_text)
+        has_children = False
+        for next_start, next_level, _ in headings[i + 1:]:
+            if next_level <= level:
+                end = next_start
+                break
+            has_children = True
+        # Don't swallow a closing code fence around the whole document
+        body = markdown_text[start:end]
+        if body.rstrip().endswith("```") and end == len(markdown_text):
+            end = start + body.rstrip().rfind("```")
+        slug = re.sub(r"[^a-z0-9]+", "-", title.lower()).strip("-")
+        sections.append({"id": f"{i}-{slug}", "title": title, "level": level, "start": start, "end": end, "has_children": has_children})
+    
+    # Top-level sections: those at the shallowest level, or the children of a
+    # single title heading. Among them, only the ones without sub-headings are
+    # regenerable; deeper sections (modules) always are.
+    top_level = min((s["level"] for s in sections), default=0)
+    roots = [s for s in sections if s["level"] == top_level]
+    title_section = roots[0] if len(roots) == 1 and roots[0]["has_children"] else None
+    if title_section:
+        top_level = min((s["level"] for s in sections if s is not title_section), default=0)
+    for section in sections:
+        if section is title_section:
+            section["regenerable"] = False
+        elif section["level"] == top_level:
+            section["regenerable"] = not section["has_children"]
+        else:
+            section["regenerable"] = True
+        del section["has_children"]
+    return sections
+
+def replace_section(markdown_text, section_id, new_section_text):
+    """
+    Splices a new section into the document in place of an existing one.
+    
+    Args:
+        markdown_text (str): The syllabus Markdown.
+        section_id (str): Id from parse_sections.
+        new_section_text (str): Replacement Markdown, including its heading.
+        
+    Returns:
+        str: The updated document.
+    """
+    section = next(s for s in parse_sections(markdown_text) if s["id"] == section_id)
+    old_text = markdown_text[section["start"]:section["end"]]
+    trailing = old_text[len(old_text.rstrip()):] or "\n"
+    return markdown_text[:section["start"]] + new_section_text.strip() + trailing + markdown_text[section["end"]:]
+
+def regenerate_section(markdown_text, section_id, source_excerpt, change_request, api_key, language='en'):
+    """
+    Regenerates a single section of a syllabus, sending only the document's
+    outline, the section itself and a short source excerpt.
+    
+    Args:
+        markdown_text (str): The full syllabus Markdown.
+        section_id (str): Id from parse_sections.
+        source_excerpt (str): Source text relevant to the section.
+        change_request (str): What the instructor wants changed.
+        api_key (str): Google Gemini API Key.
+        language (str): Target language ('en' or 'it').
+        
+    Returns:
+        str: The new section in Markdown (heading included), to be passed to replace_section.
+    """
+    sections = parse_sections(markdown_text)
+    section = next(s for s in sections if s["id"] == section_id)
+    if not section["regenerable"]:
+        return f"Error regenerating section: '{section['title']}' only groups other sections; pick one of them instead."
+    
+    import google.generativeai as genai
+    
+    current_text = markdown_text[section["start"]:section["end"]].strip()
+    outline = "\n".join(f"{'  ' * (s['level'] - 1)}- {s['title']}" for s in sections)
+    heading_line = current_text.splitlines()[0]
+    
+    genai.configure(api_key=api_key)
+    model = genai.GenerativeModel('gemini-2.0-flash')
+    
+    lang_instruction = "English" if language == 'en' else "Italian"
+    
+    prompt = f"""
+    You are an expert curriculum designer revising ONE section of an existing course syllabus written in {lang_instruction}.
+    Rewrite only the section below, keeping its heading level, its sub-headings and the same structure as the other sections
+    (for modules: **Theory**, **Organization**, **Labs** with lab titles only, no URLs).
+    Do not repeat content that belongs to other sections of the outline.
+    Return only the rewritten section in Markdown, starting with its heading.
+    
+    Syllabus Outline:
+    {outline}
+    
+    Section to Rewrite:
+    {current_text}
+    
+    Requested Change:
+    {change_request or "Improve this section."}
+    
+    Relevant Source Text (excerpt):
+    {source_excerpt[:8000]}
+    """
+    
+    try:
+        response = model.generate_content(prompt)
+        new_text = response.text.strip()
+        # Drop a code fence the model may wrap the answer in
+        new_text = re.sub(r"^```(?:markdown)?\s*|\s*```$", "", new_text)
+        # The section must keep its heading level, or replace_section would
+        # change the document structure around it
+        heading = _HEADING_RE.match(new_text)
+        if not heading:
+            new_text = f"{heading_line}\n\n{new_text}"
+        elif len(heading.group(1)) != section["level"]:
+            new_text = f"{'#' * section['level']} {heading.group(2).strip()}{new_text[heading.end():]}"
+        return new_text
+    except Exception as e:
+        return f"Error regenerating section: {e}"
+
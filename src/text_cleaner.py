@@ -0,0 +1,174 @@
+import hashlib
+import re
+from collections import Counter
+
+# A line must appear on at least this share of pages (and on at least
+# MIN_REPEAT_PAGES pages) to be treated as a running header or footer.
+REPEAT_RATIO = 0.5
+MIN_REPEAT_PAGES = 3
+
+# Lines longer than this are body text, never headers/footers.
+MAX_BOILERPLATE_LEN = 120
+
+# Page numbers are only looked for among the first/last non-empty lines of a page,
+# so standalone numbers in tables or roman-looking words in the body are kept.
+PAGE_EDGE_LINES = 3
+
+_PAGE_NUMBER_RE = re.compile(r"^(page\s*)?\d{1,4}(\s*(of|/)\s*\d{1,4})?$", re.IGNORECASE)
+_ROMAN_PAGE_RE = re.compile(r"^[ivx]{1,5}$", re.IGNORECASE)
+_TOC_LINE_RE = re.compile(r"(\.\s?){4,}\s*\d{1,4}$")
+_COPYRIGHT_RE = re.compile(r"(©|\(c\)\s*\d{4}|copyright\s*(©\s*)?(\d{4}|by\b)|all rights reserved)", re.IGNORECASE)
+_HYPHEN_BREAK_RE = re.compile(r"(\w)-\n(\w)")
+_SPACES_RE = re.compile(r"[ \t\f\v ]+")
+_BLANK_LINES_RE = re.compile(r"\n{3,}")
+
+
+def _line_key(line, mask_digits=True):
+    """
+    Hashes a line. Across pages digits are masked so running headers like
+    'Chapter 3 - 41' and 'Chapter 3 - 42' match; within a single document
+    they are not, so 'Step 1' and 'Step 2' stay distinct.
+    """
+    key = line.lower()
+    if mask_digits:
+        key = re.sub(r"\d+", "#", key)
+    return hashlib.md5(key.encode("utf-8")).hexdigest()
+
+
+def _is_page_number(line):
+    """Returns True for lines like '12', 'Page 3 of 40' or 'xiv'."""
+    return bool(_PAGE_NUMBER_RE.match(line) or _ROMAN_PAGE_RE.match(line))
+
+
+def _is_boilerplate(line):
+    """Returns True for table of contents leaders and copyright lines."""
+    if _TOC_LINE_RE.search(line):
+        return True
+    if len(line) <= MAX_BOILERPLATE_LEN and _COPYRIGHT_RE.search(line):
+        return True
+    return False
+
+
+def normalize_whitespace(text):
+    """
+    Joins hyphenated line breaks and collapses runs of spaces and blank lines.
+
+    Args:
+        text (str): Raw text.
+
+    Returns:
+        str: Normalized text.
+    """
+    text = _HYPHEN_BREAK_RE.sub(r"\1\2", text)
+    text = _SPACES_RE.sub(" ", text)
+    text = "\n".join(line.strip() for line in text.splitlines())
+    text = _BLANK_LINES_RE.sub("\n\n", text)
+    return text.strip()
+
+
+def clean_pages(pages):
+    """
+    Removes running headers/footers, page numbers (first/last lines of a page
+    only), TOC and copyright lines from a list of page texts, then normalizes
+    whitespace.
+
+    Lines are hashed (with digits masked) and counted once per page; lines that
+    repeat across a large share of pages are dropped.
+
+    Args:
+        pages (list[str]): Text of each page, in order.
+
+    Returns:
+        tuple[list[str], dict]: Cleaned pages and stats with 'original_chars',
+        'cleaned_chars' and 'removed_lines'.
+    """
+    page_lines = [[line.strip() for line in page.splitlines()] for page in pages]
+
+    counts = Counter()
+    for lines in page_lines:
+        counts.update({_line_key(line) for line in lines if line and len(line) <= MAX_BOILERPLATE_LEN})
+
+    threshold = max(MIN_REPEAT_PAGES, int(len(pages) * REPEAT_RATIO))
+    repeated = {key for key, n in counts.items() if n >= threshold}
+
+    cleaned = []
+    removed = 0
+    for lines in page_lines:
+        non_empty = [i for i, line in enumerate(lines) if line]
+        edges = set(non_empty[:PAGE_EDGE_LINES] + non_empty[-PAGE_EDGE_LINES:])
+        kept = []
+        for i, line in enumerate(lines):
+            if line and (
+                _is_boilerplate(line)
+                or _line_key(line) in repeated
+                or (i in edges and _is_page_number(line))
+            ):
+                removed += 1
+                continue
+            kept.append(line)
+        cleaned.append(normalize_whitespace("\n".join(kept)))
+
+    stats = {
+        "original_chars": sum(len(page) for page in pages),
+        "cleaned_chars": sum(len(page) for page in cleaned),
+        "removed_lines": removed,
+    }
+    return cleaned, stats
+
+
+def clean_text(text):
+    """
+    Cleans a single document (e.g. scraped web text) that has no page breaks.
+
+    Short lines repeated verbatim MIN_REPEAT_PAGES or more times (menus, share
+    buttons, cookie banners) are kept once; TOC and copyright lines are dropped. Page
+    numbers are not stripped since the text has no page edges.
+
+    Args:
+        text (str): Raw text.
+
+    Returns:
+        tuple[str, dict]: Cleaned text and stats (see clean_pages).
+    """
+    lines = [line.strip() for line in text.splitlines()]
+    counts = Counter(_line_key(line, mask_digits=False) for line in lines if line and len(line) <= MAX_BOILERPLATE_LEN)
+
+    seen = set()
+    kept = []
+    removed = 0
+    for line in lines:
+        if line:
+            key = _line_key(line, mask_digits=False)
+            if _is_boilerplate(line) or (counts[key] >= MIN_REPEAT_PAGES and key in seen):
+                removed += 1
+                continue
+            seen.add(key)
+        kept.append(line)
+
+    cleaned = normalize_whitespace("\n".join(kept))
+    stats = {
+        "original_chars": len(text),
+        "cleaned_chars": len(cleaned),
+        "removed_lines": removed,
+    }
+    return cleaned, stats
+
+
+def merge_stats(*stats_list):
+    """Sums several stats dictionaries returned by clean_pages/clean_text."""
+    total = {"original_chars": 0, "cleaned_chars": 0, "removed_lines": 0}
+    for stats in stats_list:
+        for key in total:
+            total[key] += stats.get(key, 0)
+    return total
+
+
+def format_shrink_report(stats):
+    """Returns a one-line human readable summary of a stats dictionary."""
+    original = stats["original_chars"]
+    cleaned = stats["cleaned_chars"]
+    saved = (1 - cleaned / original) * 100 if original else 0.0
+    return (
+        f"Boilerplate removal: {original:,} → {cleaned:,} characters "
+        f"(-{saved:.1f}%, {stats['removed_lines']:,} lines dropped)."
+    )
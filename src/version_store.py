@@ -0,0 +1,182 @@
+import difflib
+import hashlib
+import json
+import os
+import zlib
+
+# A revision is stored as a full snapshot at least every KEYFRAME_INTERVAL
+# deltas, so reading any revision replays a bounded number of deltas.
+KEYFRAME_INTERVAL = 10
+
+DEFAULT_RETENTION = {
+    # Earlier revisions kept per document, besides the current one
+    "max_edit_history": 10,
+    # Newest versions whose PDFs stay stored; older ones are regenerated on demand
+    "keep_pdfs_for_last": 5,
+}
+
+
+def make_delta(base, text):
+    """
+    Encodes text as line operations against base.
+
+    Args:
+        base (str): The text the delta is relative to.
+        text (str): The new text.
+
+    Returns:
+        list: ["c", start, end] copies base lines [start:end]; ["i", str] inserts text.
+    """
+    base_lines = base.splitlines(keepends=True)
+    new_lines = text.splitlines(keepends=True)
+    ops = []
+    matcher = difflib.SequenceMatcher(None, base_lines, new_lines, autojunk=False)
+    for tag, i1, i2, j1, j2 in matcher.get_opcodes():
+        if tag == "equal":
+            ops.append(["c", i1, i2])
+        elif j2 > j1:
+            ops.append(["i", "".join(new_lines[j1:j2])])
+    return ops
+
+
+def apply_delta(base, ops):
+    """Rebuilds the text encoded by make_delta."""
+    base_lines = base.splitlines(keepends=True)
+    parts = []
+    for op in ops:
+        if op[0] == "c":
+            parts.extend(base_lines[op[1]:op[2]])
+        else:
+            parts.append(op[1])
+    return "".join(parts)
+
+
+class VersionStore:
+    """
+    Compressed, content-addressed storage for a course's generated documents.
+
+    Markdown revisions are stored as zlib-compressed line deltas against a
+    base revision (the previous edit, or the same document in the previous
+    version), with periodic full snapshots. PDFs are stored zlib-compressed.
+    """
+
+    def __init__(self, store_dir):
+        self.objects_dir = os.path.join(store_dir, "objects")
+        self.pdfs_dir = os.path.join(store_dir, "pdfs")
+        os.makedirs(self.objects_dir, exist_ok=True)
+        os.makedirs(self.pdfs_dir, exist_ok=True)
+
+    def _object_path(self, rev_id):
+        return os.path.join(self.objects_dir, f"{rev_id}.z")
+
+    def _read_object(self, rev_id):
+        with open(self._object_path(rev_id), "rb") as f:
+            return json.loads(zlib.decompress(f.read()).decode("utf-8"))
+
+    def _write_object(self, rev_id, obj):
+        tmp_path = self._object_path(rev_id) + ".tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(json.dumps(obj, ensure_ascii=False).encode("utf-8"), 9))
+        os.replace(tmp_path, self._object_path(rev_id))
+
+    def put_text(self, text, base_id=None):
+        """
+        Stores a Markdown revision, as a delta against base_id when possible.
+
+        Args:
+            text (str): The Markdown content.
+            base_id (str, optional): Revision the new text is most similar to.
+
+        Returns:
+            str: Revision id (a hash of the content; identical texts share it).
+        """
+        rev_id = hashlib.sha256(text.encode("utf-8")).hexdigest()[:32]
+        if os.path.exists(self._object_path(rev_id)):
+            return rev_id
+
+        obj = {"base": None, "depth": 0, "text": text}
+        if base_id and base_id != rev_id and os.path.exists(self._object_path(base_id)):
+            base = self._read_object(base_id)
+            if base["depth"] + 1 < KEYFRAME_INTERVAL:
+                ops = make_delta(self.get_text(base_id), text)
+                # Keep the delta only if it is actually smaller than the snapshot
+                if len(json.dumps(ops, ensure_ascii=False)) < len(text):
+                    obj = {"base": base_id, "depth": base["depth"] + 1, "ops": ops}
+
+        self._write_object(rev_id, obj)
+        return rev_id
+
+    def get_text(self, rev_id):
+        """Returns the Markdown of a revision, replaying its delta chain."""
+        chain = []
+        obj = self._read_object(rev_id)
+        while obj["base"] is not None:
+            chain.append(obj["ops"])
+            obj = self._read_object(obj["base"])
+
+        text = obj["text"]
+        for ops in reversed(chain):
+            text = apply_delta(text, ops)
+        return text
+
+    def put_pdf(self, name, pdf_bytes):
+        """Stores a PDF compressed under its filename."""
+        tmp_path = os.path.join(self.pdfs_dir, f"{name}.z.tmp")
+        with open(tmp_path, "wb") as f:
+            f.write(zlib.compress(pdf_bytes, 9))
+        os.replace(tmp_path, os.path.join(self.pdfs_dir, f"{name}.z"))
+
+    def get_pdf(self, name):
+        """Returns the bytes of a stored PDF, or None if it was pruned."""
+        try:
+            with open(os.path.join(self.pdfs_dir, f"{name}.z"), "rb") as f:
+                return zlib.decompress(f.read())
+        except FileNotFoundError:
+            return None
+
+    def delete_pdf(self, name):
+        try:
+            os.remove(os.path.join(self.pdfs_dir, f"{name}.z"))
+        except FileNotFoundError:
+            pass
+
+    def prune(self, live_ids):
+        """
+        Deletes revisions not in live_ids. Live revisions whose delta chain
+        goes through a deleted revision are first rewritten as full snapshots.
+
+        Args:
+            live_ids (set[str]): Revision ids still referenced by metadata.
+        """
+        all_ids = {name[:-2] for name in os.listdir(self.objects_dir) if name.endswith(".z")}
+        dead_ids = all_ids - live_ids
+        if not dead_ids:
+            return
+
+        # Shallowest first: once a base is rebased, revisions on top of it
+        # stay deltas instead of also becoming snapshots
+        live_objects = {rev_id: self._read_object(rev_id) for rev_id in live_ids & all_ids}
+        for rev_id in sorted(live_objects, key=lambda rev_id: live_objects[rev_id]["depth"]):
+            obj = self._read_object(rev_id)
+            # Walk the chain to see if it depends on a revision about to be deleted
+            base_id = obj["base"]
+            while base_id is not None and base_id not in dead_ids:
+                base_id = self._read_object(base_id)["base"]
+            if base_id is not None:
+                self._write_object(rev_id, {"base": None, "depth": 0, "text": self.get_text(rev_id)})
+
+        # Rebasing shortened chains; recompute depths so keyframe spacing stays correct
+        for rev_id in live_ids & all_ids:
+            obj = self._read_object(rev_id)
+            if obj["base"] is not None:
+                depth = 0
+                base_id = obj["base"]
+                while base_id is not None:
+                    depth += 1
+                    base_id = self._read_object(base_id)["base"]
+                if depth != obj["depth"]:
+                    obj["depth"] = depth
+                    self._write_object(rev_id, obj)
+
+        for rev_id in dead_ids:
+            os.remove(self._object_path(rev_id))
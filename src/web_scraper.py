@@ -1,5 +1,3 @@
-import requests
-from bs4 import BeautifulSoup
 import re
 
 def scrape_text_from_url(url):
@@ -12,6 +10,10 @@ def scrape_text_from_url(url):
     Returns:
         str: Extracted text or an error message.
     """
+    # Deferred: requests and bs4 are only needed when a page is actually scraped
+    import requests
+    from bs4 import BeautifulSoup
+    
     try:
         # Add a user agent to mimic a browser
         headers = {
@@ -41,3 +43,32 @@ def scrape_text_from_url(url):
         
     except Exception as e:
         return f"Error scraping {url}: {str(e)}"
+
+def fetch_url_validators(url):
+    """
+    Fetches the HTTP cache validators of a URL without downloading its body.
+    
+    Args:
+        url (str): The URL to check.
+        
+    Returns:
+        dict: 'etag' and/or 'last_modified' if the server sends them, else empty.
+    """
+    import requests
+    
+    try:
+        headers = {
+            'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/91.0.4472.124 Safari/537.36'
+        }
+        response = requests.head(url, headers=headers, timeout=5, allow_redirects=True)
+        response.raise_for_status()
+        
+        validators = {}
+        if response.headers.get('ETag'):
+            validators['etag'] = response.headers['ETag']
+        if response.headers.get('Last-Modified'):
+            validators['last_modified'] = response.headers['Last-Modified']
+        return validators
+        
+    except Exception:
+        return {}
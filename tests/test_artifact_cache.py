@@ -0,0 +1,33 @@
+from src.artifact_cache import ArtifactCache
+
+
+def test_hit_only_for_same_fingerprint(tmp_path):
+    cache = ArtifactCache(str(tmp_path))
+    cache.put("pdf_text", "book.pdf", "fp1", {"text": "hello"})
+
+    assert cache.get("pdf_text", "book.pdf", "fp1") == {"text": "hello"}
+    assert cache.get("pdf_text", "book.pdf", "fp2") is None
+    assert cache.get("pdf_text", "book.pdf", None) is None
+    assert cache.skipped == ["pdf_text: book.pdf"]
+
+
+def test_concurrent_instances_do_not_overwrite_each_other(tmp_path):
+    ui_cache = ArtifactCache(str(tmp_path))
+    build_cache = ArtifactCache(str(tmp_path))
+
+    build_cache.put("pdf_text", "book.pdf", "fp", {"text": "pages"})
+    ui_cache.put("syllabus", "en", "fp", "# Syllabus")
+
+    fresh = ArtifactCache(str(tmp_path))
+    assert fresh.get("pdf_text", "book.pdf", "fp") == {"text": "pages"}
+    assert fresh.get("syllabus", "en", "fp") == "# Syllabus"
+
+
+def test_prune_drops_removed_sources(tmp_path):
+    cache = ArtifactCache(str(tmp_path))
+    cache.put("pdf_text", "old.pdf", "fp", {})
+    cache.put("pdf_text", "new.pdf", "fp", {})
+    cache.prune("pdf_text", {"new.pdf"})
+
+    assert cache.get("pdf_text", "old.pdf", "fp") is None
+    assert cache.get("pdf_text", "new.pdf", "fp") == {}
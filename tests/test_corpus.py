@@ -0,0 +1,97 @@
+import json
+import os
+import time
+
+import pytest
+
+import src.corpus as corpus
+
+
+@pytest.fixture
+def course_path(tmp_path):
+    path = tmp_path / "course"
+    os.makedirs(path / "pdfs")
+    with open(path / "resources.json", "w") as f:
+        json.dump({"links": [{"url": "https://example.com/docs", "description": "Docs"}]}, f)
+    return str(path)
+
+
+def test_validated_page_is_not_rescraped(course_path, monkeypatch):
+    scrapes = []
+    monkeypatch.setattr(corpus, "fetch_url_validators", lambda url: {"etag": '"v1"'})
+    monkeypatch.setattr(corpus, "scrape_text_from_url", lambda url: scrapes.append(url) or "Kubernetes autoscaling guide")
+
+    with corpus.load_corpus(course_path) as reader:
+        assert reader.built
+        assert "autoscaling" in reader.source_text(0)
+    with corpus.load_corpus(course_path) as reader:
+        assert not reader.built
+    assert len(scrapes) == 1
+
+
+def test_changed_or_unvalidated_page_is_rescraped(course_path, monkeypatch):
+    validators = {"etag": '"v1"'}
+    monkeypatch.setattr(corpus, "fetch_url_validators", lambda url: dict(validators))
+    scrapes = []
+    monkeypatch.setattr(corpus, "scrape_text_from_url", lambda url: scrapes.append(url) or "text")
+
+    corpus.load_corpus(course_path).close()
+    validators["etag"] = '"v2"'
+    with corpus.load_corpus(course_path) as reader:
+        assert reader.built
+    validators.clear()
+    with corpus.load_corpus(course_path) as reader:
+        assert reader.built
+    assert len(scrapes) == 3
+
+    # Retrieval callers can skip the HEAD checks
+    with corpus.load_corpus(course_path, revalidate_web=False) as reader:
+        assert not reader.built
+
+
+def test_excerpt_keeps_best_chunk_larger_than_budget(course_path, monkeypatch):
+    monkeypatch.setattr(corpus, "fetch_url_validators", lambda url: {})
+    monkeypatch.setattr(corpus, "scrape_text_from_url", lambda url: "Kubernetes autoscaling of pods. " * 800)
+
+    with corpus.load_corpus(course_path) as reader:
+        excerpt = reader.relevant_excerpt("Kubernetes autoscaling pods", max_chars=1000)
+
+    assert excerpt.startswith("--- Docs ---\nKubernetes autoscaling")
+    assert len(excerpt) <= 1000
+
+
+def test_page_without_blank_lines_is_chunked(course_path, monkeypatch):
+    page = "\n".join(f"Line {n}: horizontal pod autoscaling reacts to load." for n in range(400))
+    monkeypatch.setattr(corpus, "fetch_url_validators", lambda url: {})
+    monkeypatch.setattr(corpus, "scrape_text_from_url", lambda url: page)
+
+    with corpus.load_corpus(course_path) as reader:
+        chunks = [reader.read_chunk(i) for i in reader.source_chunks(0)]
+
+    assert len(chunks) > 1
+    assert all(len(chunk) <= corpus.CHUNK_CHARS for chunk in chunks)
+    assert "\n".join(chunks) == page
+
+
+def test_synchronous_and_background_builds_do_not_overlap(course_path, monkeypatch):
+    monkeypatch.setattr(corpus, "fetch_url_validators", lambda url: {})
+    monkeypatch.setattr(corpus, "scrape_text_from_url", lambda url: "text")
+    build_corpus = corpus.build_corpus
+    running = []
+    overlaps = []
+
+    def slow_build(path):
+        overlaps.append(len(running))
+        running.append(path)
+        # A build scheduled from another session while this one is running
+        if len(overlaps) == 1:
+            corpus.schedule_corpus_build(path)
+            time.sleep(0.2)
+        build_corpus(path)
+        running.remove(path)
+
+    monkeypatch.setattr(corpus, "build_corpus", slow_build)
+    corpus.load_corpus(course_path).close()
+    corpus.wait_for_corpus_build(course_path)
+
+    assert overlaps == [0, 0]
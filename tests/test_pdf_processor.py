@@ -0,0 +1,58 @@
+import pypdf
+import pytest
+
+from src.pdf_processor import extract_outline_from_pdf, format_outline
+
+
+@pytest.fixture
+def book_pdf(tmp_path):
+    """8 pages: i-ii of front matter, then 1-6, with nested bookmarks."""
+    writer = pypdf.PdfWriter()
+    for _ in range(8):
+        writer.add_blank_page(width=200, height=200)
+    writer.set_page_label(0, 1, style="/r")
+    writer.set_page_label(2, 7, style="/D")
+
+    writer.add_outline_item("Preface", 0)
+    part = writer.add_outline_item("Part I", 2)
+    writer.add_outline_item("Chapter 1", 2, parent=part)
+    writer.add_outline_item("Chapter 2", 4, parent=part)
+    writer.add_outline_item("Part II", 6)
+
+    path = tmp_path / "book.pdf"
+    with open(path, "wb") as f:
+        writer.write(f)
+    return str(path)
+
+
+def test_outline_page_ranges_and_labels(book_pdf):
+    entries = extract_outline_from_pdf(book_pdf)
+
+    assert [(e["title"], e["level"], e["start_page"], e["end_page"], e["start_label"], e["end_label"]) for e in entries] == [
+        ("Preface", 0, 1, 2, "i", "ii"),
+        ("Part I", 0, 3, 6, "1", "4"),
+        ("Chapter 1", 1, 3, 4, "1", "2"),
+        ("Chapter 2", 1, 5, 6, "3", "4"),
+        ("Part II", 0, 7, 8, "5", "6"),
+    ]
+
+
+def test_format_outline(book_pdf):
+    assert format_outline("book.pdf", extract_outline_from_pdf(book_pdf)) == "\n".join([
+        "### book.pdf",
+        "- Preface (pp. i–ii)",
+        "- Part I (pp. 1–4)",
+        "  - Chapter 1 (pp. 1–2)",
+        "  - Chapter 2 (pp. 3–4)",
+        "- Part II (pp. 5–6)",
+    ])
+
+
+def test_pdf_without_outline(tmp_path):
+    writer = pypdf.PdfWriter()
+    writer.add_blank_page(width=200, height=200)
+    path = tmp_path / "plain.pdf"
+    with open(path, "wb") as f:
+        writer.write(f)
+
+    assert extract_outline_from_pdf(str(path)) == []
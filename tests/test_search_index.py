@@ -0,0 +1,76 @@
+import json
+import os
+import sqlite3
+
+import src.corpus as corpus
+import src.course_manager as course_manager
+from src.course_manager import CourseManager
+
+
+def test_links_with_same_description_are_both_indexed(tmp_path, monkeypatch):
+    manager = CourseManager(str(tmp_path / "courses"))
+    manager.create_course("k8s")
+    links = [
+        {"url": "https://example.com/autoscaling", "description": "Docs"},
+        {"url": "https://example.com/networking", "description": "Docs"},
+    ]
+    with open(os.path.join(manager.root_dir, "k8s", "resources.json"), "w") as f:
+        json.dump({"links": links}, f)
+    monkeypatch.setattr(corpus, "fetch_url_validators", lambda url: {})
+    monkeypatch.setattr(corpus, "scrape_text_from_url", lambda url: f"Guide about {url.rsplit('/', 1)[1]}")
+
+    manager.get_corpus("k8s").close()
+
+    for word, url in [("autoscaling", links[0]["url"]), ("networking", links[1]["url"])]:
+        results = manager.search(word)
+        assert [(r["source"], r["title"]) for r in results] == [(url, "Docs")]
+
+
+def test_missing_fts5_disables_search_only(tmp_path, monkeypatch):
+    def no_fts5(db_path):
+        raise sqlite3.OperationalError("no such module: fts5")
+
+    monkeypatch.setattr("src.search_index.SearchIndex", no_fts5)
+    manager = CourseManager(str(tmp_path / "courses"))
+
+    assert not manager.is_search_available()
+    assert manager.create_course("k8s")
+    assert manager.list_courses() == ["k8s"]
+    assert manager.search("anything") == []
+    manager.delete_course("k8s")
+
+
+def test_backfill_runs_once_per_root(tmp_path, monkeypatch):
+    root = tmp_path / "courses"
+    os.makedirs(root / "legacy" / "output")
+    monkeypatch.setattr(course_manager, "_backfilled_roots", set())
+    backfilled = []
+    monkeypatch.setattr(CourseManager, "_backfill_search_index", lambda self, name: backfilled.append(name))
+
+    manager = CourseManager(str(root))
+    manager.search("first")
+    manager.search("second")
+    CourseManager(str(root)).search("third")
+
+    assert backfilled == ["legacy"]
+
+
+def test_legacy_course_sources_are_indexed_by_next_corpus_build(tmp_path, monkeypatch):
+    root = tmp_path / "courses"
+    os.makedirs(root / "legacy" / "pdfs")
+    with open(root / "legacy" / "resources.json", "w") as f:
+        json.dump({"links": [{"url": "https://example.com/hpa", "description": "HPA"}]}, f)
+    monkeypatch.setattr(course_manager, "_backfilled_roots", set())
+    monkeypatch.setattr(corpus, "fetch_url_validators", lambda url: {})
+    scrapes = []
+    monkeypatch.setattr(corpus, "scrape_text_from_url", lambda url: scrapes.append(url) or "Horizontal pod autoscaling")
+
+    manager = CourseManager(str(root))
+    # Searching only backfills versions: no scraping, and the course is not marked yet
+    assert manager.search("autoscaling") == []
+    corpus.wait_for_corpus_build(str(root / "legacy"))
+    assert scrapes == [] and not manager.search_index.is_course_indexed("legacy")
+
+    manager.get_corpus("legacy").close()
+    assert manager.search_index.is_course_indexed("legacy")
+    assert [r["title"] for r in manager.search("autoscaling")] == ["HPA"]
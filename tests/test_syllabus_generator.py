@@ -0,0 +1,183 @@
+import pytest
+
+import src.syllabus_generator as syllabus_generator
+from src.syllabus_generator import parse_sections, regenerate_section, replace_section
+
+SYLLABUS = """# Kubernetes Fundamentals
+
+## Learning Intent
+Understand clusters.
+
+## Program Modules
+
+### Module 1: Pods
+**Theory**: pods.
+
+### Module 2: Services
+**Theory**: services.
+
+## Expectations
+Basic Linux.
+"""
+
+
+class _FakeModel:
+    def __init__(self, reply):
+        self.reply = reply
+
+    def generate_content(self, prompt):
+        return type("Response", (), {"text": self.reply})()
+
+
+@pytest.fixture
+def model_reply(monkeypatch):
+    import google.generativeai as genai
+
+    reply = {}
+    monkeypatch.setattr(genai, "configure", lambda api_key: None)
+    monkeypatch.setattr(genai, "GenerativeModel", lambda name: _FakeModel(reply["text"]))
+    return reply
+
+
+MODULES_WITH_SUBHEADINGS = """# Kubernetes Fundamentals
+
+## Learning Intent
+Understand clusters.
+
+## Program Modules
+
+### Module 1: Pods
+#### Theory
+Pods and containers.
+#### Labs
+Lab: Deploy a Pod
+
+### Module 2: Services
+#### Theory
+Services.
+
+## Expectations
+Basic Linux.
+"""
+
+
+def test_title_and_wrapper_are_not_regenerable():
+    regenerable = [s["title"] for s in parse_sections(SYLLABUS) if s["regenerable"]]
+    assert regenerable == ["Learning Intent", "Module 1: Pods", "Module 2: Services", "Expectations"]
+
+
+def test_module_with_subheadings_is_regenerated_whole(model_reply):
+    model_reply["text"] = "### Module 1: Pods\n#### Theory\nPods, init containers.\n#### Labs\nLab: Debug a Pod"
+    sections = parse_sections(MODULES_WITH_SUBHEADINGS)
+    pods = next(s for s in sections if s["title"] == "Module 1: Pods")
+    assert pods["regenerable"]
+    assert not next(s for s in sections if s["title"] == "Program Modules")["regenerable"]
+
+    updated = replace_section(MODULES_WITH_SUBHEADINGS, pods["id"], regenerate_section(MODULES_WITH_SUBHEADINGS, pods["id"], "", "", "key"))
+
+    assert "init containers" in updated and "Deploy a Pod" not in updated
+    assert "### Module 2: Services\n#### Theory\nServices." in updated
+
+
+def test_parent_section_is_rejected(model_reply):
+    modules = next(s for s in parse_sections(SYLLABUS) if s["title"] == "Program Modules")
+    assert regenerate_section(SYLLABUS, modules["id"], "", "", "key").startswith("Error regenerating")
+
+
+@pytest.mark.parametrize("reply", [
+    "# Module 2: Services\n**Theory**: ClusterIP and Ingress.",
+    "**Theory**: ClusterIP and Ingress.",
+])
+def test_regenerated_section_keeps_heading_level(model_reply, reply):
+    model_reply["text"] = reply
+    services = next(s for s in parse_sections(SYLLABUS) if s["title"] == "Module 2: Services")
+
+    new_section = regenerate_section(SYLLABUS, services["id"], "", "", "key")
+    updated = replace_section(SYLLABUS, services["id"], new_section)
+
+    assert new_section.startswith("### Module 2: Services\n")
+    assert [(s["title"], s["level"]) for s in parse_sections(updated)] == \
+        [(s["title"], s["level"]) for s in parse_sections(SYLLABUS)]
+    assert "Ingress" in updated and "## Expectations\nBasic Linux." in updated
+
+
+class _FakeBackend:
+    def __init__(self, name, remote):
+        self.name = name
+        self.remote = remote
+        self.deleted = []
+
+    def create(self, genai, context_text, ttl_seconds):
+        return f"handle:{context_text}"
+
+    def generate(self, genai, handle, prompt):
+        return type("Response", (), {"text": prompt})()
+
+    def delete(self, handle):
+        self.deleted.append(handle)
+
+
+def test_context_cache_counts_only_remote_reuse_as_hits():
+    remote = _FakeBackend("gemini", remote=True)
+    cache = syllabus_generator.ContextCache(backends=[remote])
+    first, second = cache.session(), cache.session()
+
+    first.generate(None, "key", "context", "en")
+    first.generate(None, "key", "context", "it")
+    second.generate(None, "key", "context", "mapping")
+    assert (first.hits, first.misses, second.hits, second.misses) == (1, 1, 1, 0)
+
+    local = syllabus_generator.ContextCache(backends=[_FakeBackend("local", remote=False)]).session()
+    local.generate(None, "key", "context", "en")
+    local.generate(None, "key", "context", "it")
+    assert local.stats()["hits"] == 0 and local.stats()["backends"] == ["local"]
+
+
+def test_context_cache_deletes_superseded_handles(monkeypatch):
+    remote = _FakeBackend("gemini", remote=True)
+    cache = syllabus_generator.ContextCache(ttl_seconds=3600, backends=[remote])
+
+    cache.session(scope="k8s").generate(None, "key", "old sources", "en")
+    cache.session(scope="k8s").generate(None, "key", "new sources", "en")
+    assert remote.deleted == ["handle:old sources"]
+
+    # Expired handles are released on the next lookup
+    now = syllabus_generator.time.time()
+    monkeypatch.setattr(syllabus_generator.time, "time", lambda: now + 3600)
+    cache.session(scope="gcp").generate(None, "key", "other course", "en")
+    assert remote.deleted == ["handle:old sources", "handle:new sources"]
+
+
+def test_topic_mapping_with_outline_skips_shared_context(model_reply):
+    model_reply["text"] = "| Block | Chapters |"
+    session = syllabus_generator.ContextCache(backends=[_FakeBackend("gemini", remote=True)]).session()
+
+    mapping = syllabus_generator.generate_topic_mapping("x" * 50000, "key", outline_text="- Pods (pp. 1-10)", shared_context=session)
+
+    assert mapping == "| Block | Chapters |"
+    assert session.hits + session.misses == 0
+
+
+def test_context_upload_does_not_block_other_lookups():
+    import threading
+
+    uploading = threading.Event()
+    release = threading.Event()
+
+    class _SlowBackend(_FakeBackend):
+        def create(self, genai, context_text, ttl_seconds):
+            if context_text == "slow course":
+                uploading.set()
+                release.wait(5)
+            return super().create(genai, context_text, ttl_seconds)
+
+    cache = syllabus_generator.ContextCache(backends=[_SlowBackend("gemini", remote=True)])
+    slow = threading.Thread(target=cache.session(scope="slow").generate, args=(None, "key", "slow course", "en"))
+    slow.start()
+    uploading.wait(5)
+
+    # Another course is served while the first upload is still in flight
+    cache.session(scope="fast").generate(None, "key", "fast course", "en")
+    assert slow.is_alive()
+    release.set()
+    slow.join()
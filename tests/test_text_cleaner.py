@@ -0,0 +1,33 @@
+from src.text_cleaner import clean_pages, clean_text
+
+
+def test_enumerated_c_item_is_not_copyright():
+    text, _ = clean_text("(a) first\n(b) second\n(c) third step")
+    assert "(c) third step" in text
+
+
+def test_copyright_lines_are_dropped():
+    text, stats = clean_text("Intro\nCopyright 2020 ACME\n(c) 2019 ACME\n© ACME Press")
+    assert text == "Intro"
+    assert stats["removed_lines"] == 3
+
+
+def test_page_numbers_only_stripped_at_page_edges():
+    page = "Title\n12\nbody\nvi\n2023\n100\nmore\nend\n13"
+    (cleaned,), _ = clean_pages([page])
+    lines = cleaned.splitlines()
+    assert "12" not in lines and "13" not in lines
+    assert {"vi", "2023", "100"} <= set(lines)
+
+
+def test_repeated_headers_are_dropped():
+    pages = [f"Running Header\nbody about topic {word}\n{i}" for i, word in enumerate(["alpha", "beta", "gamma", "delta"])]
+    cleaned, stats = clean_pages(pages)
+    assert cleaned[0] == "body about topic alpha"
+    assert stats["cleaned_chars"] < stats["original_chars"]
+
+
+def test_numbered_lines_in_one_document_are_kept():
+    text, stats = clean_text("Step 1 install\nStep 2 install\nStep 3 install\nStep 4 install\nMenu\nMenu\nMenu")
+    assert text == "Step 1 install\nStep 2 install\nStep 3 install\nStep 4 install\nMenu"
+    assert stats["removed_lines"] == 2
@@ -0,0 +1,82 @@
+import json
+import os
+
+import pytest
+
+import src.pdf_generator as pdf_generator
+from src.course_manager import CourseManager
+from src.version_store import KEYFRAME_INTERVAL, VersionStore, apply_delta, make_delta
+
+
+def _document(n, lines=50):
+    return "".join(f"Line {i} of a long syllabus section, revision {n if i == n % lines else 0}\n" for i in range(lines))
+
+
+@pytest.mark.parametrize("base, text", [
+    ("", "# Title\n"),
+    ("# Title\nBody\n", ""),
+    ("a\nb\nc\n", "a\nB\nc\nd"),
+    ("no trailing newline", "no trailing newline\nmore"),
+])
+def test_delta_round_trip(base, text):
+    assert apply_delta(base, make_delta(base, text)) == text
+
+
+def test_snapshot_every_keyframe_interval(tmp_path):
+    store = VersionStore(str(tmp_path))
+    rev_ids = []
+    for n in range(KEYFRAME_INTERVAL * 2 + 1):
+        rev_ids.append(store.put_text(_document(n), rev_ids[-1] if rev_ids else None))
+
+    depths = [store._read_object(rev_id)["depth"] for rev_id in rev_ids]
+    assert max(depths) == KEYFRAME_INTERVAL - 1
+    assert depths[KEYFRAME_INTERVAL] == 0
+    assert [store.get_text(rev_id) for rev_id in rev_ids] == [_document(n) for n in range(len(rev_ids))]
+
+
+def test_prune_rebases_revisions_on_deleted_bases(tmp_path):
+    store = VersionStore(str(tmp_path))
+    rev_ids = []
+    for n in range(4):
+        rev_ids.append(store.put_text(_document(n), rev_ids[-1] if rev_ids else None))
+
+    # Drop the snapshot and the first delta: the remaining chain must survive
+    store.prune(set(rev_ids[2:]))
+
+    assert store._read_object(rev_ids[2]) == {"base": None, "depth": 0, "text": _document(2)}
+    assert store._read_object(rev_ids[3])["depth"] == 1
+    assert store.get_text(rev_ids[3]) == _document(3)
+    assert not os.path.exists(store._object_path(rev_ids[0]))
+
+
+def test_migration_keeps_existing_files_and_incomplete_dirs(tmp_path, monkeypatch):
+    monkeypatch.setattr(pdf_generator, "convert_markdown_to_pdf", lambda text: b"%PDF-1.4")
+    manager = CourseManager(str(tmp_path / "courses"))
+    manager.create_course("k8s")
+    output_dir = os.path.join(manager.root_dir, "k8s", "output")
+
+    legacy = [
+        {"version": 1, "name": "v1", "timestamp": "2024-01-01 10:00:00", "pdf_en": None, "pdf_it": None, "pdf_tm": None},
+        {"version": 2, "name": "v2", "timestamp": "2024-01-02 10:00:00", "pdf_en": None, "pdf_it": None, "pdf_tm": None},
+    ]
+    for version_meta in legacy:
+        os.makedirs(os.path.join(output_dir, version_meta["name"]))
+        files = {"syllabus_en.md": f"# EN {version_meta['name']}", "syllabus_it.md": f"# IT {version_meta['name']}"}
+        if version_meta["name"] == "v1":
+            files["topic_mapping.md"] = "# Mapping v1"
+        for name, text in files.items():
+            with open(os.path.join(output_dir, version_meta["name"], name), "w", encoding="utf-8") as f:
+                f.write(text)
+    with open(os.path.join(output_dir, "v2", "notes.txt"), "w") as f:
+        f.write("kept by hand")
+    with open(os.path.join(manager.root_dir, "k8s", "versions.json"), "w") as f:
+        json.dump(legacy, f)
+
+    manager.save_version("k8s", "# EN v3", "# IT v3", "# Mapping v3")
+
+    v2 = manager.get_version_content("k8s", 2)
+    assert (v2["syllabus_en"], v2["syllabus_it"], v2["topic_mapping"]) == ("# EN v2", "# IT v2", "")
+    assert manager.get_version_content("k8s", 1)["topic_mapping"] == "# Mapping v1"
+    # v1 was fully migrated; v2 holds a file the migration does not know about
+    assert not os.path.exists(os.path.join(output_dir, "v1"))
+    assert os.path.exists(os.path.join(output_dir, "v2", "notes.txt"))